@@ -36,7 +36,7 @@ class TestComment:
         model_fields = Comment._meta.fields
         text_field = search_field(model_fields, 'text')
         assert text_field is not None, 'Добавьте название события `text` модели `Comment`'
-        assert type(text_field) == fields.TextField, (
+        assert isinstance(text_field, fields.TextField), (
             'Свойство `text` модели `Comment` должно быть текстовым `TextField`'
         )
 
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import DeletionTask
+
+
+@admin.register(DeletionTask)
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'object_repr', 'content_type', 'status', 'progress', 'created',
+        'updated'
+    )
+    list_filter = ('status',)
+    list_select_related = ('content_type',)
+    readonly_fields = [field.name for field in DeletionTask._meta.fields]
+
+    def progress(self, task):
+        return f'{task.deleted} / {task.total}'
+    progress.short_description = 'Удалено'
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Кэши, которые каждый процесс держит у себя
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """Поколение контента, последние посты и скрытые авторы хранятся в
+    кэше и сдвигаются сигналами: процессы должны видеть один кэш."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'Кэш по умолчанию свой у каждого процесса',
+        hint=(
+            'Процессы, не видевшие сдвиг поколения, бесконечно отвечают '
+            '304 по старому ETag. Укажите общий кэш: адрес memcached в '
+            'MEMCACHED_LOCATION.'
+        ),
+        id='core.W001',
+    )]
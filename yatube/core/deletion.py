@@ -0,0 +1,164 @@
+"""Удаление объектов с большим числом зависимых записей по частям.
+
+Обычный ``delete()`` собирает все каскадно удаляемые записи в памяти и
+удаляет их одной транзакцией, всё это время держа блокировку записи
+SQLite. Здесь зависимые записи удаляются (или обнуляются ссылки на
+объект для ``SET_NULL``) пачками по первичному ключу, начиная с самых
+глубоких, каждая пачка — в своей короткой транзакции с паузой после
+неё, чтобы остальные запросы на запись успевали проходить. Корневая
+запись удаляется последней, когда зависимых почти не осталось.
+
+Задачи хранятся в ``DeletionTask``; админка ставит их в очередь и
+запускает в фоновом потоке, а ``manage.py process_deletions`` доделывает
+оставшиеся, например после перезапуска сервера. На объект приходится не
+больше одной незавершённой задачи, а выполняет её тот, кто первым
+перевёл её из очереди в работу.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models, transaction
+from django.db.models import F
+
+from .models import DeletionTask
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = 200
+DELETE_PAUSE = 0.05
+
+
+def deletion_plan(model, queryset, seen=()):
+    """Шаги удаления зависимых от ``queryset`` записей: кортежи
+    (queryset, поле), где поле — None для удаления или имя внешнего
+    ключа, который надо обнулить. Глубокие зависимости идут первыми."""
+    plan = []
+    for relation in model._meta.related_objects:
+        if relation.many_to_many or relation.related_model in seen:
+            continue
+        related = relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': queryset.values('pk')}
+        )
+        if relation.on_delete is models.CASCADE:
+            plan.extend(deletion_plan(
+                relation.related_model, related, seen + (model,)
+            ))
+            plan.append((related, None))
+        elif relation.on_delete is models.SET_NULL:
+            plan.append((related, relation.field.name))
+    return plan
+
+
+def run_step(queryset, field, batch_size, pause, progress):
+    model = queryset.model
+    last = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        with transaction.atomic():
+            rows = model._base_manager.filter(pk__in=pks)
+            if field is None:
+                rows.delete()
+            else:
+                rows.update(**{field: None})
+        progress(len(pks))
+        last = pks[-1]
+        time.sleep(pause)
+
+
+def schedule_deletion(obj):
+    """Задача удаления объекта; уже стоящая в очереди или выполняющаяся
+    задача не дублируется."""
+    content_type = ContentType.objects.get_for_model(obj)
+    with transaction.atomic():
+        task = DeletionTask.objects.filter(
+            content_type=content_type,
+            object_id=obj.pk,
+            status__in=DeletionTask.UNFINISHED,
+        ).first()
+        if task is None:
+            task = DeletionTask.objects.create(
+                content_type=content_type,
+                object_id=obj.pk,
+                object_repr=str(obj)[:200],
+            )
+    return task
+
+
+def claim_task(task):
+    """Переводит задачу из очереди в работу. Условный UPDATE атомарен:
+    из нескольких потоков и процессов задачу получает только один."""
+    return DeletionTask.objects.filter(
+        pk=task.pk, status=DeletionTask.PENDING
+    ).update(status=DeletionTask.RUNNING) == 1
+
+
+def run_task(task, batch_size=DELETE_BATCH_SIZE, pause=DELETE_PAUSE):
+    """Выполняет задачу; прогресс пишется в неё после каждой пачки.
+    Возвращает None, если задачу уже забрал кто-то другой."""
+    if not claim_task(task):
+        return None
+
+    def progress(count):
+        DeletionTask.objects.filter(pk=task.pk).update(
+            deleted=F('deleted') + count
+        )
+
+    try:
+        model = task.content_type.model_class()
+        root = model._base_manager.filter(pk=task.object_id)
+        plan = deletion_plan(model, root)
+        # Прерванная задача считается заново по оставшимся записям
+        total = sum(queryset.count() for queryset, _ in plan) + 1
+        DeletionTask.objects.filter(pk=task.pk).update(
+            total=total, deleted=0
+        )
+        for queryset, field in plan:
+            run_step(queryset, field, batch_size, pause, progress)
+        with transaction.atomic():
+            for obj in root:
+                obj.delete()
+        progress(1)
+    except Exception as error:
+        logger.exception('Фоновое удаление %s не удалось', task)
+        DeletionTask.objects.filter(pk=task.pk).update(
+            status=DeletionTask.FAILED, error=str(error)
+        )
+        return False
+    DeletionTask.objects.filter(pk=task.pk).update(status=DeletionTask.DONE)
+    return True
+
+
+def run_tasks(task_ids):
+    try:
+        for task in DeletionTask.objects.filter(pk__in=task_ids):
+            run_task(task)
+    finally:
+        # Поток заканчивается, его соединение больше не нужно
+        connection.close()
+
+
+def delete_in_background(modeladmin, request, queryset):
+    tasks = [schedule_deletion(obj) for obj in queryset]
+    if settings.DELETION_IN_BACKGROUND_THREAD:
+        ids = [task.pk for task in tasks]
+        transaction.on_commit(lambda: threading.Thread(
+            target=run_tasks, args=(ids,), daemon=True
+        ).start())
+    modeladmin.message_user(
+        request,
+        f'Поставлено в очередь на удаление: {len(tasks)}. Ход удаления '
+        'виден в разделе «Фоновые удаления».',
+        messages.SUCCESS,
+    )
+
+
+delete_in_background.short_description = 'Удалить в фоне по частям'
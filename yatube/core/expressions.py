@@ -0,0 +1,13 @@
+from django.db.models.expressions import RawSQL
+
+
+class RawSubquery(RawSQL):
+    """Подзапрос на SQL для ``__in``.
+
+    ``RawSQL`` сам берёт SQL в скобки, и ``__in`` добавляет ещё одни:
+    SQLite читает ``IN ((SELECT ...))`` как скалярный подзапрос и берёт
+    только его первую строку. Здесь скобки ставит только ``__in``.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
@@ -0,0 +1,71 @@
+"""Текстовое поле, которое сжимает длинные значения в базе.
+
+Значения короче ``COMPRESS_MIN_BYTES`` хранятся обычной строкой. Длинные
+сжимаются zlib с уровнем ``ZLIB_LEVEL`` и пишутся в колонку как BLOB с
+маркерным байтом впереди. SQLite хранит BLOB в колонке с TEXT-affinity
+как есть, поэтому схема не меняется. При чтении значение распаковывается
+автоматически; значения, записанные раньше в zstd, тоже читаются, а
+``manage.py compress_texts`` переписывает их в zlib.
+
+Кодек и уровень один на всех машинах, не зависит от установленных
+пакетов, поэтому ``filter(text=...)`` по длинному тексту находит строки,
+записанные в другом месте, пока zlib собран из той же версии. Поиск
+``contains``/``icontains`` по сжатым значениям не работает: для
+полнотекстового поиска нужен отдельный индекс.
+"""
+import zlib
+
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESS_MIN_BYTES = 1024
+# От уровня зависят байты в базе, а с ними и точный поиск по тексту
+ZLIB_LEVEL = 6
+ZLIB_MARKER = b'\x01'
+ZSTD_MARKER = b'\x02'
+
+
+def compress_text(value):
+    """Сжимает строку, если она длинная и сжатие даёт выигрыш."""
+    raw = value.encode()
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return value
+    packed = ZLIB_MARKER + zlib.compress(raw, ZLIB_LEVEL)
+    if len(packed) >= len(raw):
+        return value
+    return packed
+
+
+def decompress_text(value):
+    """Распаковывает значение из базы; строки возвращаются как есть."""
+    if not isinstance(value, (bytes, memoryview)):
+        return value
+    value = bytes(value)
+    marker, payload = value[:1], value[1:]
+    if marker == ZLIB_MARKER:
+        return zlib.decompress(payload).decode()
+    if marker == ZSTD_MARKER:
+        if zstandard is None:
+            raise RuntimeError(
+                'Для чтения значения нужен установленный zstandard'
+            )
+        return zstandard.ZstdDecompressor().decompress(payload).decode()
+    return value.decode()
+
+
+class CompressedTextField(models.TextField):
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value)
+
+    def to_python(self, value):
+        return super().to_python(decompress_text(value))
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return compress_text(value)
@@ -0,0 +1,86 @@
+"""Поколение контента для кэширования ответов и условных запросов.
+
+Поколение — время последнего изменения контента сайта, которое хранится
+в кэше и сдвигается сигналами при изменении постов и групп. Ответы
+представлений под ``generation_cached`` кэшируются с поколением в
+ключе и отдаются с ETag и Last-Modified по нему, так что после
+изменения старые записи просто перестают читаться.
+
+Поколение живёт в кэше без срока, поэтому кэш должен быть общим для
+всех процессов (проверка ``core.W001``): процесс со своим кэшем не
+увидит сдвиг и будет отвечать 304 по старому ETag бесконечно.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+GENERATION_KEY = 'content_generation'
+# Старые поколения больше не читаются: срок только освобождает место
+GENERATION_CACHE_TIMEOUT = 5 * 60
+
+
+def get_generation():
+    return cache.get_or_set(GENERATION_KEY, time.time, None)
+
+
+def bump_generation():
+    cache.set(GENERATION_KEY, time.time(), None)
+
+
+def tee_to_cache(content, key, content_type):
+    """Отдаёт куски потокового ответа и кэширует тело целиком в конце."""
+    chunks = []
+    for chunk in content:
+        chunks.append(chunk)
+        yield chunk
+    cache.set(
+        key, (content_type, b''.join(chunks)), GENERATION_CACHE_TIMEOUT
+    )
+
+
+def generation_cached(view):
+    """Кэширует GET-ответы представления по поколению контента и
+    отвечает 304 на If-None-Match/If-Modified-Since."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        generation = get_generation()
+        etag = '"%x"' % int(generation * 1000000)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(generation)
+        )
+        if response is None:
+            key = 'generation:{}:{}'.format(
+                etag.strip('"'),
+                hashlib.md5(
+                    request.build_absolute_uri().encode()
+                ).hexdigest(),
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                content_type, body = cached
+                response = HttpResponse(body, content_type=content_type)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                content_type = response['Content-Type']
+                if response.streaming:
+                    response.streaming_content = tee_to_cache(
+                        response.streaming_content, key, content_type
+                    )
+                else:
+                    cache.set(
+                        key, (content_type, response.content),
+                        GENERATION_CACHE_TIMEOUT
+                    )
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(generation)
+        return response
+    return wrapper
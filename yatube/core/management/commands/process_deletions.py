@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from core.deletion import DELETE_BATCH_SIZE, DELETE_PAUSE, run_task
+from core.models import DeletionTask
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые удаления из очереди. Задачи, прерванные '
+        'перезапуском, остаются в состоянии «Выполняется» и берутся '
+        'только с --requeue-running.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DELETE_BATCH_SIZE,
+            help='Сколько записей удалять в одной транзакции'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=DELETE_PAUSE,
+            help='Пауза в секундах после каждой пачки'
+        )
+        parser.add_argument(
+            '--requeue-running', action='store_true',
+            help='Вернуть в очередь выполняющиеся задачи; только когда '
+                 'сервер остановлен и их никто не выполняет'
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            DeletionTask.objects.filter(
+                status=DeletionTask.RUNNING
+            ).update(status=DeletionTask.PENDING)
+        tasks = DeletionTask.objects.filter(
+            status=DeletionTask.PENDING
+        ).order_by('created')
+        for task in tasks:
+            ok = run_task(task, options['batch_size'], options['sleep'])
+            if ok is None:
+                # Задачу забрал фоновый поток админки
+                continue
+            task.refresh_from_db()
+            self.stdout.write(
+                f'{task}: {task.get_status_display()}, '
+                f'удалено {task.deleted} из {task.total}'
+                + ('' if ok else f' ({task.error})')
+            )
@@ -0,0 +1,174 @@
+"""Сжатие ответов с выбором brotli, zstd или gzip по Accept-Encoding.
+
+В отличие от ``GZipMiddleware`` потоковые ответы сжимаются по кускам,
+не собирая тело целиком. Сжатые тела ответов, которые не зависят от
+cookies (RSS, карта сайта, страницы под ``generation_cached``),
+кэшируются по хэшу содержимого и не сжимаются заново на каждый запрос.
+Ответы с ``Vary: Cookie`` сжимаются без кэша: в них есть CSRF-токен или
+данные сессии, каждое тело уникально, и записи только вытесняли бы из
+кэша полезные. brotli и zstd
+используются, только если установлены пакеты ``brotli`` и ``zstandard``.
+"""
+import hashlib
+import re
+import zlib
+
+from django.core.cache import cache
+from django.utils.cache import has_vary_header, patch_vary_headers
+
+from core.fields import zstandard
+from core.staticfiles import brotli
+
+from .static import accepted_encodings
+
+COMPRESS_MIN_SIZE = 200
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/(json|javascript|xml|rss\+xml|atom\+xml)'
+    r'|image/svg\+xml)'
+)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+# Кэшируются сжатые тела не длиннее этого размера
+CACHE_MAX_SIZE = 512 * 1024
+CACHE_TIMEOUT = 5 * 60
+
+
+class GzipEncoder:
+    def __init__(self):
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush=True):
+        result = self.compressor.compress(data)
+        if flush:
+            result += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        return result
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data, flush=True):
+        result = self.compressor.process(data)
+        if flush:
+            result += self.compressor.flush()
+        return result
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL
+        ).compressobj()
+
+    def compress(self, data, flush=True):
+        result = self.compressor.compress(data)
+        if flush:
+            result += self.compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        return result
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def available_encoders():
+    """Кодировки в порядке предпочтения: (имя, класс кодировщика)."""
+    result = []
+    if brotli is not None:
+        result.append(('br', BrotliEncoder))
+    if zstandard is not None:
+        result.append(('zstd', ZstdEncoder))
+    result.append(('gzip', GzipEncoder))
+    return result
+
+
+def compress_stream(content, encoder):
+    for chunk in content:
+        data = encoder.compress(chunk) if chunk else b''
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+def compress_body(body, encoder_class):
+    encoder = encoder_class()
+    return encoder.compress(body, flush=False) + encoder.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encoders = available_encoders()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding, encoder_class = self.negotiate(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoder_class()
+            )
+            del response['Content-Length']
+        else:
+            if has_vary_header(response, 'Cookie'):
+                compressed = compress_body(response.content, encoder_class)
+            else:
+                compressed = self.compressed_body(
+                    response.content, encoding, encoder_class
+                )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def is_compressible(response):
+        if (
+            response.status_code != 200
+            or response.has_header('Content-Encoding')
+            or not COMPRESSIBLE_TYPES.match(response.get('Content-Type', ''))
+        ):
+            return False
+        return (
+            response.streaming
+            or len(response.content) >= COMPRESS_MIN_SIZE
+        )
+
+    def negotiate(self, request):
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        for encoding, encoder_class in self.encoders:
+            if encoding in accepted:
+                return encoding, encoder_class
+        return None, None
+
+    @staticmethod
+    def compressed_body(body, encoding, encoder_class):
+        key = 'compressed:{}:{}'.format(
+            encoding, hashlib.sha1(body).hexdigest()
+        )
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress_body(body, encoder_class)
+            if len(compressed) <= CACHE_MAX_SIZE:
+                cache.set(key, compressed, CACHE_TIMEOUT)
+        return compressed
@@ -0,0 +1,105 @@
+import mimetypes
+import os
+import stat as statmod
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+
+from core.staticfiles import COMPRESSIBLE_EXTENSIONS
+from core.views import file_response
+
+# Порядок предпочтения: brotli жмёт текст лучше gzip
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Имена без хэша могут поменять содержимое: только с перепроверкой
+MUTABLE_CACHE_CONTROL = 'no-cache'
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, которые клиент не запретил ``q=0``."""
+    result = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and not params[2:].strip('0.'):
+            continue
+        result.add(coding.strip().lower())
+    return result
+
+
+class PrecompressedStaticMiddleware:
+    """Отдаёт файлы из STATIC_ROOT.
+
+    Если клиент принимает brotli или gzip и у файла есть сжатая копия,
+    отдаётся она. Имена с хэшем из манифеста кэшируются на год как
+    неизменяемые, остальные — с обязательной перепроверкой по ETag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.manifest = None
+        self.hashed_names = frozenset()
+
+    def __call__(self, request):
+        if (
+            settings.STATIC_ROOT
+            and request.method in ('GET', 'HEAD')
+            and request.path_info.startswith(settings.STATIC_URL)
+        ):
+            response = self.serve(
+                request, request.path_info[len(settings.STATIC_URL):]
+            )
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def is_hashed(self, name):
+        manifest = staticfiles_storage.hashed_files
+        if manifest is not self.manifest:
+            self.manifest = manifest
+            self.hashed_names = frozenset(manifest.values())
+        return name in self.hashed_names
+
+    @staticmethod
+    def precompressed(request, full_path, stat):
+        """Сжатая копия файла, которую принимает клиент: (путь, stat,
+        кодировка); без подходящей копии — сам файл и None."""
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        for coding, suffix in PRECOMPRESSED:
+            if coding not in accepted:
+                continue
+            try:
+                return full_path + suffix, os.stat(full_path + suffix), coding
+            except OSError:
+                continue
+        return full_path, stat, None
+
+    def serve(self, request, name):
+        try:
+            full_path = safe_join(settings.STATIC_ROOT, name)
+            stat = os.stat(full_path)
+        except (SuspiciousFileOperation, OSError):
+            return None
+        if not statmod.S_ISREG(stat.st_mode):
+            return None
+        content_type = mimetypes.guess_type(full_path)[0]
+        encoding = None
+        if name.endswith(COMPRESSIBLE_EXTENSIONS):
+            full_path, stat, encoding = self.precompressed(
+                request, full_path, stat
+            )
+        response = file_response(request, full_path, stat, content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if name.endswith(COMPRESSIBLE_EXTENSIONS):
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if self.is_hashed(name)
+            else MUTABLE_CACHE_CONTROL
+        )
+        return response
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('object_repr', models.CharField(max_length=200, verbose_name='Объект')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10, verbose_name='Состояние')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего записей')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено записей')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType', verbose_name='Тип объекта')),
+            ],
+            options={
+                'verbose_name': 'фоновое удаление',
+                'verbose_name_plural': 'фоновые удаления',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """Счётчик ссылок на файл в контентно-адресуемом хранилище."""
+    name = models.CharField('Путь к файлу', max_length=255, unique=True)
+    refcount = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'файл хранилища'
+        verbose_name_plural = 'файлы хранилища'
+
+    def __str__(self):
+        return self.name
+
+
+class DeletionTask(models.Model):
+    """Фоновое удаление объекта вместе с зависимыми записями
+    (см. ``core.deletion``)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+    UNFINISHED = (PENDING, RUNNING)
+
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        verbose_name='Тип объекта'
+    )
+    object_id = models.PositiveIntegerField('id объекта')
+    object_repr = models.CharField('Объект', max_length=200)
+    status = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        db_index=True
+    )
+    total = models.PositiveIntegerField('Всего записей', default=0)
+    deleted = models.PositiveIntegerField('Удалено записей', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'фоновое удаление'
+        verbose_name_plural = 'фоновые удаления'
+
+    def __str__(self):
+        return self.object_repr
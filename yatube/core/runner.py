@@ -0,0 +1,27 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tests',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+
+class LocalCacheTestRunner(DiscoverRunner):
+    """Запускает тесты с кэшем в памяти процесса: тесты вызывают
+    ``cache.clear()``, и общий кэш сайта они бы очистили."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Процесс тестов один, предупреждение core.W001 здесь не нужно
+        self.test_settings = override_settings(
+            CACHES=TEST_CACHES, SILENCED_SYSTEM_CHECKS=['core.W001']
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,77 @@
+"""Хранилище статики с хэшем содержимого в именах и заранее сжатыми копиями.
+
+``collectstatic`` кладёт в ``STATIC_ROOT`` файлы вида ``app.3f2a9c1b7d4e.css``
+и манифест, по которому ``{% static %}`` подставляет эти имена. Рядом с
+текстовыми файлами пишутся копии ``.gz`` и ``.br`` (brotli — если
+установлен пакет ``brotli``); их отдаёт
+``core.middleware.static.PrecompressedStaticMiddleware``.
+"""
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.html', '.txt', '.json', '.xml', '.ico',
+)
+PRECOMPRESS_MIN_SIZE = 256
+# Сжатая копия нужна, только если она заметно меньше исходника
+PRECOMPRESS_MAX_RATIO = 0.95
+
+
+def compressors():
+    """Пары (суффикс, функция сжатия) для заранее сжатых копий."""
+    result = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        result.append(('.br', brotli.compress))
+    return result
+
+
+class PrecompressedManifestStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        processed = {}
+        for name, hashed_name, done in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(done, Exception):
+                processed[name] = hashed_name
+            yield name, hashed_name, done
+        if dry_run:
+            return
+        for name, hashed_name in processed.items():
+            self.precompress(name)
+            self.precompress(hashed_name)
+
+    def precompress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < PRECOMPRESS_MIN_SIZE:
+            return
+        for suffix, compress in compressors():
+            packed = compress(data)
+            if len(packed) > len(data) * PRECOMPRESS_MAX_RATIO:
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(packed))
+
+    def url(self, name, force=False):
+        # Пока collectstatic не запускался (разработка, тесты), манифеста
+        # нет: отдаём имя без хэша, а не падаем. Если манифест есть,
+        # пропавшая запись — ошибка сборки: без хэша файл отдавался бы
+        # как неизменяемый и застревал бы в кэшах клиентов
+        try:
+            return super().url(name, force)
+        except ValueError:
+            if settings.DEBUG or not self.exists(self.manifest_name):
+                return FileSystemStorage.url(self, name)
+            raise
@@ -0,0 +1,134 @@
+"""Хранилище медиафайлов с именами по содержимому.
+
+Файл сохраняется под именем ``<каталог>/ab/cd/<sha256><расширение>``:
+два уровня подкаталогов по первым байтам хэша держат каталоги маленькими,
+а одинаковые загрузки попадают в один и тот же файл. Сколько записей
+ссылается на файл, хранится в ``core.StoredFile``. Ссылку прибавляет
+``retain()`` в той же транзакции, что сохраняет запись с именем файла,
+поэтому несохранённая запись ссылку не оставляет; файл, на который так
+никто и не сослался, убирает ``manage.py media_gc``. Файл удаляется с
+диска, когда последняя ссылка освобождена через ``release()``.
+
+Рядом с файлом могут лежать его варианты другой ширины
+``<имя>.w<ширина><расширение>``; у них нет своих счётчиков, они
+удаляются вместе с исходным файлом.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import StoredFile
+
+VARIANT_RE = re.compile(r'\.w\d+\.[^./]+$')
+HASHED_NAME_RE = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}[^/]*$'
+)
+
+
+def source_stem(name):
+    """Имя без расширения; для варианта — имя исходного файла без
+    расширения."""
+    match = VARIANT_RE.search(name)
+    if match:
+        return name[:match.start()]
+    return os.path.splitext(name)[0]
+
+
+class HashedMediaStorage(FileSystemStorage):
+    @staticmethod
+    def digest(content):
+        sha = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha.update(chunk)
+        content.seek(0)
+        return sha.hexdigest()
+
+    @staticmethod
+    def hashed_name(name, digest):
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()[:10]
+        return '/'.join(
+            part for part in (
+                directory, digest[:2], digest[2:4], digest + ext
+            ) if part
+        )
+
+    @staticmethod
+    def is_hashed_name(name):
+        return bool(HASHED_NAME_RE.search(name))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, self.digest(content))
+        if not self.exists(name):
+            name = self._save(name, content)
+        return name.replace('\\', '/')
+
+    def retain(self, name):
+        """Прибавляет ссылку на файл; вызывается в транзакции, которая
+        сохраняет ссылающуюся запись. Имена, выданные не хранилищем,
+        не считаются."""
+        if not name or not self.is_hashed_name(name):
+            return
+        StoredFile.objects.get_or_create(name=name)
+        StoredFile.objects.filter(name=name).update(
+            refcount=F('refcount') + 1
+        )
+
+    def release(self, name):
+        """Освобождает ссылку; файл удаляется после коммита, если
+        ссылок не осталось."""
+        if not name:
+            return
+        StoredFile.objects.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1
+        )
+        transaction.on_commit(lambda: self.collect(name))
+
+    def collect(self, name):
+        with transaction.atomic():
+            deleted, _ = StoredFile.objects.filter(
+                name=name, refcount=0
+            ).delete()
+            if deleted:
+                self.purge(name)
+
+    @staticmethod
+    def variant_name(name, width):
+        stem, ext = os.path.splitext(name)
+        return f'{stem}.w{width}{ext}'
+
+    def save_variant(self, name, width, content):
+        """Сохраняет вариант файла заданной ширины, если его ещё нет."""
+        variant = self.variant_name(name, width)
+        if not self.exists(variant):
+            self._save(variant, ContentFile(content))
+        return variant
+
+    def purge(self, name):
+        """Удаляет файл и его варианты с диска, не глядя на счётчики
+        ссылок."""
+        super().delete(name)
+        directory, base = os.path.split(name)
+        prefix = os.path.splitext(base)[0] + '.w'
+        try:
+            files = self.listdir(directory)[1]
+        except FileNotFoundError:
+            return
+        for file_name in files:
+            if file_name.startswith(prefix):
+                super().delete(os.path.join(directory, file_name))
+
+    def delete(self, name):
+        self.release(name)
@@ -1,4 +1,21 @@
+import mimetypes
+import os
+import re
+import stat as statmod
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Каталоги MEDIA_ROOT, которые можно отдавать: картинки постов и миниатюры
+MEDIA_PUBLIC_PREFIXES = ('posts/', 'cache/')
+MEDIA_CACHE_CONTROL = 'public, max-age=31536000, immutable'
 
 
 def page_not_found(request, exception):
@@ -17,3 +34,112 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+class RangeFile:
+    """Файл, из которого читается не больше ``length`` байт с ``start``."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Разбирает заголовок Range с одним диапазоном байт.
+
+    Возвращает (начало, конец) включительно, None, если заголовок надо
+    проигнорировать, или ValueError, если диапазон невыполним.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(0, size - int(end)), size - 1
+        if start > end:
+            raise ValueError(header)
+        return start, end
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def serve_media(request, path):
+    """Отдаёт файл из MEDIA_ROOT.
+
+    За nginx или Apache Django только проверяет доступ и передаёт отдачу
+    фронт-серверу заголовком X-Accel-Redirect или X-Sendfile. Без него
+    файл отдаётся через FileResponse с поддержкой Range, ETag и
+    долгим кэшированием: имена медиафайлов не переиспользуются.
+    """
+    if not path.startswith(MEDIA_PUBLIC_PREFIXES) or '/.' in f'/{path}':
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not statmod.S_ISREG(stat.st_mode):
+        raise Http404
+    content_type = mimetypes.guess_type(full_path)[0]
+    backend = settings.MEDIA_SERVE_BACKEND
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        )
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = file_response(request, full_path, stat, content_type)
+    response['Cache-Control'] = MEDIA_CACHE_CONTROL
+    return response
+
+
+def file_response(request, full_path, stat, content_type):
+    etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if not_modified is not None:
+        return not_modified
+    byte_range = None
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(file, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
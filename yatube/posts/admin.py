@@ -1,40 +1,124 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+from core.deletion import delete_in_background
 
 from .models import Comment, Follow, Group, Post
+from .search import fts_enabled, matching_post_ids
+
+# До стольких строк таблицы считаются точно
+ESTIMATE_MIN_ROWS = 10000
+# Отфильтрованный список считается не дальше этой границы
+COUNT_LIMIT = 10000
+
+
+def estimate_count(model):
+    """Примерное число строк таблицы без полного прохода по ней."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else 0
+    # Максимальный id читается по индексу первичного ключа
+    return model._default_manager.aggregate(last=Max('pk'))['last'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор списков админки без точного COUNT(*) по большой таблице.
+
+    Для списка без фильтров берётся оценка числа строк, отфильтрованный
+    список считается не дальше ``COUNT_LIMIT``.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model)
+            if estimate > ESTIMATE_MIN_ROWS:
+                return estimate
+        return queryset.order_by().values('pk')[:COUNT_LIMIT].count()
 
 
-class PostAdmin(admin.ModelAdmin):
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class PostAdmin(ScalableAdmin):
     # Перечисляем поля, которые должны отображаться в админке
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
     # Добавляем интерфейс для поиска по тексту постов
     search_fields = ('text',)
     # Добавляем возможность фильтрации по дате
     list_filter = ('pub_date',)
-    list_editable = ('group',)
+    date_hierarchy = 'pub_date'
+    raw_id_fields = ('author', 'group')
     empty_value_display = '-пусто-'
+    actions = (delete_in_background,)
+
+    def get_list_display(self, request):
+        # Колонка текста показывает сохранённое начало, как post_excerpt
+        # у комментариев: распаковывать весь text на каждую строку дорого
+        return tuple(
+            'excerpt' if name == 'text' else name
+            for name in super().get_list_display(request)
+        )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('text')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Тексты сжаты, поэтому ищем по полнотекстовому индексу
+        if not search_term.strip() or not fts_enabled():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=matching_post_ids(search_term)), False
 
 
 admin.site.register(Post, PostAdmin)
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(ScalableAdmin):
     list_display = ('title', 'slug', 'description')
-    search_fields = ('description',)
+    search_fields = ('^title', 'description')
+    actions = (delete_in_background,)
 
 
 admin.site.register(Group, GroupAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ('post', 'author', 'created', 'text')
+class CommentAdmin(ScalableAdmin):
+    list_display = ('post_excerpt', 'author', 'created', 'text')
+    list_select_related = ('post', 'author')
     list_filter = ('created',)
+    date_hierarchy = 'created'
+    raw_id_fields = ('post', 'author')
+
+    def get_queryset(self, request):
+        # Пост нужен только ради начала текста: полный text не читаем
+        return super().get_queryset(request).defer('post__text')
+
+    def post_excerpt(self, comment):
+        return comment.post.excerpt[:15]
+    post_excerpt.short_description = 'пост'
 
 
 admin.site.register(Comment, CommentAdmin)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableAdmin):
     list_display = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
 
 
 admin.site.register(Follow, FollowAdmin)
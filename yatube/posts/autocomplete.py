@@ -0,0 +1,44 @@
+"""Подсказки групп по началу названия.
+
+Названия всех групп хранятся в кэше одним списком, отсортированным по
+названию без учёта регистра; подсказки ищутся в нём двоичным поиском.
+Список сбрасывается сигналами при изменении групп.
+"""
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+from core.generation import GENERATION_CACHE_TIMEOUT
+
+from .models import Group
+
+GROUP_INDEX_KEY = 'group_autocomplete_index'
+AUTOCOMPLETE_LIMIT = 20
+
+
+def group_index():
+    """Список (название в нижнем регистре, id, название)."""
+    index = cache.get(GROUP_INDEX_KEY)
+    if index is None:
+        index = sorted(
+            (title.casefold(), pk, title)
+            for pk, title in Group.objects.values_list('id', 'title')
+        )
+        cache.set(GROUP_INDEX_KEY, index, GENERATION_CACHE_TIMEOUT)
+    return index
+
+
+def forget_group_index():
+    cache.delete(GROUP_INDEX_KEY)
+
+
+def search_groups(prefix, limit=AUTOCOMPLETE_LIMIT):
+    index = group_index()
+    prefix = prefix.casefold()
+    start = bisect_left(index, (prefix,))
+    result = []
+    for folded, pk, title in index[start:start + limit]:
+        if not folded.startswith(prefix):
+            break
+        result.append({'id': pk, 'title': title})
+    return result
@@ -0,0 +1,83 @@
+"""Счётчик просмотров постов с отложенной записью.
+
+``UPDATE`` на каждый просмотр занимал бы единственного писателя SQLite,
+поэтому просмотры копятся в памяти процесса, а фоновый поток раз в
+``VIEW_FLUSH_INTERVAL`` секунд записывает их пачками: посты с одинаковым
+приростом обновляются одним ``UPDATE ... SET views = views + n``.
+Прирост, не записанный до падения процесса, теряется — для счётчика
+просмотров это допустимо. Страница поста показывает сохранённое число
+вместе с ещё не записанным приростом своего процесса.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+VIEW_FLUSH_INTERVAL = 5
+VIEW_FLUSH_BATCH = 500
+
+
+class ViewCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.flusher_enabled = False
+        self.flusher_pid = None
+
+    def add(self, post_id):
+        with self.lock:
+            self.pending[post_id] += 1
+        # После fork поток родителя в дочернем процессе не работает
+        if self.flusher_enabled and self.flusher_pid != os.getpid():
+            self.start_flusher()
+
+    def get(self, post_id):
+        with self.lock:
+            return self.pending.get(post_id, 0)
+
+    def flush(self):
+        """Записывает накопленный прирост; возвращает число постов."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        by_increment = defaultdict(list)
+        for post_id, increment in pending.items():
+            by_increment[increment].append(post_id)
+        with transaction.atomic():
+            for increment, post_ids in by_increment.items():
+                for start in range(0, len(post_ids), VIEW_FLUSH_BATCH):
+                    Post.objects.filter(
+                        pk__in=post_ids[start:start + VIEW_FLUSH_BATCH]
+                    ).update(views=F('views') + increment)
+        return len(pending)
+
+    def start_flusher(self):
+        """Запускает фоновую запись. Вызывается из wsgi.py, поэтому
+        поток есть только у процессов, обслуживающих запросы."""
+        self.flusher_enabled = True
+        with self.lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+        threading.Thread(target=self.run_flusher, daemon=True).start()
+        atexit.register(self.flush)
+
+    def run_flusher(self):
+        while True:
+            time.sleep(VIEW_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать просмотры')
+                connection.close()
+
+
+view_counter = ViewCounter()
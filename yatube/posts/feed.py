@@ -0,0 +1,295 @@
+"""Лёгкие карточки ленты.
+
+Ленты (главная, группа, профайл, подписки) не создают экземпляры
+``Post``, ``User`` и ``Group``: нужные колонки выбираются через
+``values_list()`` и раскладываются в компактные объекты со ``__slots__``,
+у которых те же имена атрибутов, что и у моделей, поэтому шаблоны
+работают с ними без изменений. Вместо полного ``text`` карточка
+получает сохранённое начало ``excerpt`` и флаг ``has_more``, так что
+объём страницы не зависит от длины постов.
+"""
+import heapq
+
+from django.core.paginator import Paginator
+from django.db.models.fields.files import ImageFieldFile
+
+from .models import Group, Post, User
+
+COUNT_POSTS = 10
+# Скрытые авторы при подсчёте постов подставляются в IN частями
+MUTED_CHUNK = 500
+FEED_ORDERING = ('-pub_date', '-id')
+
+FEED_FIELDS = (
+    'id',
+    'excerpt',
+    'has_more',
+    'pub_date',
+    'image',
+    'image_variants',
+    'image_placeholder',
+    'author_id',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group_id',
+    'group__slug',
+    'group__title',
+)
+
+IMAGE_FIELD = Post._meta.get_field('image')
+PUB_DATE = FEED_FIELDS.index('pub_date')
+AUTHOR_ID = FEED_FIELDS.index('author_id')
+
+
+class Row:
+    """Общая часть карточек: сравнение с моделью по первичному ключу."""
+    __slots__ = ()
+    model = None
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __eq__(self, other):
+        if isinstance(other, (type(self), self.model)):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.model, self.pk))
+
+
+class AuthorRow(Row):
+    __slots__ = ('id', 'username', 'first_name', 'last_name')
+    model = User
+
+    def __init__(self, id, username, first_name, last_name):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    def __str__(self):
+        return self.username
+
+
+class GroupRow(Row):
+    __slots__ = ('id', 'slug', 'title')
+    model = Group
+
+    def __init__(self, id, slug, title):
+        self.id = id
+        self.slug = slug
+        self.title = title
+
+    def __str__(self):
+        return self.title
+
+
+class PostRow(Row):
+    __slots__ = (
+        'id', 'excerpt', 'has_more', 'pub_date', 'image', 'image_variants',
+        'image_placeholder', 'author', 'group', 'like_count', 'liked'
+    )
+    model = Post
+
+    def __init__(self, id, excerpt, has_more, pub_date, image,
+                 image_variants, image_placeholder, author, group):
+        self.id = id
+        self.excerpt = excerpt
+        self.has_more = has_more
+        self.pub_date = pub_date
+        self.image = image
+        self.image_variants = image_variants
+        self.image_placeholder = image_placeholder
+        self.author = author
+        self.group = group
+        # Проставляются posts.likes.annotate_likes
+        self.like_count = 0
+        self.liked = False
+
+    def __str__(self):
+        return self.excerpt[:15]
+
+
+def make_row(values):
+    """Собирает карточку из кортежа колонок ``FEED_FIELDS``."""
+    (pk, excerpt, has_more, pub_date, image, image_variants,
+     image_placeholder, author_id, username, first_name, last_name,
+     group_id, slug, title) = values
+    group = None
+    if group_id is not None:
+        group = GroupRow(group_id, slug, title)
+    return PostRow(
+        pk,
+        excerpt,
+        has_more,
+        pub_date,
+        ImageFieldFile(None, IMAGE_FIELD, image),
+        image_variants,
+        image_placeholder,
+        AuthorRow(author_id, username, first_name, last_name),
+        group,
+    )
+
+
+class FilteredFeed:
+    """Лента без постов скрытых авторов ``muted`` для ``Paginator``.
+
+    Читает по порядку ленты только пары (id, author_id) с запасом,
+    пропускает скрытых авторов и догружает колонки карточек нужного
+    среза по id, поэтому страницы остаются полными, а запрос ленты — тем
+    же, что и без скрытых авторов.
+    """
+
+    def __init__(self, post_list, muted):
+        self.post_list = post_list
+        self.muted = muted
+
+    def count(self):
+        muted = sorted(self.muted)
+        hidden = 0
+        for start in range(0, len(muted), MUTED_CHUNK):
+            hidden += self.post_list.filter(
+                author_id__in=muted[start:start + MUTED_CHUNK]
+            ).count()
+        return self.post_list.count() - hidden
+
+    def visible_ids(self, stop):
+        ids = []
+        offset = 0
+        chunk = stop + COUNT_POSTS
+        pairs = self.post_list.values_list('id', 'author_id')
+        while len(ids) < stop:
+            rows = list(pairs[offset:offset + chunk])
+            ids.extend(
+                pk for pk, author_id in rows if author_id not in self.muted
+            )
+            if len(rows) < chunk:
+                break
+            offset += chunk
+            chunk *= 2
+        return ids
+
+    def __getitem__(self, index):
+        # Paginator берёт только срезы
+        return feed_rows(self.visible_ids(index.stop)[index.start:index.stop])
+
+
+def feed_rows(ids):
+    """Кортежи колонок карточек для id в том же порядке."""
+    rows = {
+        values[0]: values for values in Post.objects.filter(
+            pk__in=ids
+        ).values_list(*FEED_FIELDS)
+    }
+    return [rows[pk] for pk in ids if pk in rows]
+
+
+def row_key(row):
+    """Порядок ленты для кортежа ``FEED_FIELDS``: (pub_date, id)."""
+    return row[PUB_DATE], row[0]
+
+
+def merge_streams(streams, stop, muted=frozenset(), key=row_key,
+                  author=lambda row: row[AUTHOR_ID]):
+    """Сливает упорядоченные от новых к старым потоки постов без
+    повторов и без скрытых авторов.
+
+    ``streams`` — пары (начало потока, прочитан ли он целиком). Старше
+    последнего поста недочитанного потока могут быть посты, которых нет
+    в выборке, поэтому слияние на нём останавливается. Возвращает
+    (посты, хватило ли их): не хватило — значит, надо читать дальше.
+    """
+    boundary = max(
+        (key(rows[-1]) for rows, complete in streams if not complete),
+        default=None
+    )
+    merged = []
+    last = None
+    for row in heapq.merge(
+        *(rows for rows, _ in streams), key=key, reverse=True
+    ):
+        current = key(row)
+        if boundary is not None and current < boundary:
+            return merged, False
+        # Одинаковые посты из разных потоков идут подряд
+        if current == last:
+            continue
+        last = current
+        if author(row) in muted:
+            continue
+        merged.append(row)
+        if len(merged) == stop:
+            return merged, True
+    return merged, boundary is None
+
+
+class MergedFeed:
+    """Объединение нескольких лент без повторов для ``Paginator``.
+
+    ``sources`` — функции ``read(limit)``, которые возвращают первые
+    ``limit`` постов своей ленты от новых к старым в виде (pub_date, id,
+    author_id). Ленты сливаются по порядку; не хватило постов — каждая
+    дочитывается с удвоенным запасом. Число постов считает вызывающий.
+    """
+
+    def __init__(self, sources, count, muted=frozenset()):
+        self.sources = sources
+        self.total = count
+        self.muted = muted
+
+    def count(self):
+        return self.total
+
+    def visible_ids(self, stop):
+        limit = stop + COUNT_POSTS
+        while True:
+            streams = []
+            for read in self.sources:
+                rows = list(read(limit))
+                streams.append((rows, len(rows) < limit))
+            rows, enough = merge_streams(
+                streams, stop, self.muted,
+                key=lambda row: tuple(row[:2]), author=lambda row: row[2]
+            )
+            if enough:
+                return [row[1] for row in rows]
+            limit *= 2
+
+    def __getitem__(self, index):
+        return feed_rows(self.visible_ids(index.stop)[index.start:index.stop])
+
+
+def get_feed_page(request, post_list, muted=frozenset()):
+    """Страница ленты из карточек для queryset постов."""
+    if muted:
+        object_list = FilteredFeed(post_list, muted)
+    else:
+        object_list = post_list.values_list(*FEED_FIELDS)
+    return paginate(request, object_list)
+
+
+def paginate(request, object_list):
+    """Страница карточек для последовательности кортежей ``FEED_FIELDS``."""
+    paginator = Paginator(object_list, COUNT_POSTS)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = [
+        make_row(values) for values in page_obj.object_list
+    ]
+    return page_obj
+
+
+def get_ranked_page(request, post_ids):
+    """Страница ленты по готовому списку id в нужном порядке; удалённые
+    посты пропускаются."""
+    paginator = Paginator(post_ids, COUNT_POSTS)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = [
+        make_row(values) for values in feed_rows(page_obj.object_list)
+    ]
+    return page_obj
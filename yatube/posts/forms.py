@@ -1,13 +1,19 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 
 from .models import Comment, Post
+from .uploads import check_dimensions, process_upload
+from .widgets import GroupAutocompleteWidget
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('group', 'text', 'image')
+        # Выбор группы из подсказок: поле остаётся ModelChoiceField и
+        # проверяется одним запросом по первичному ключу
+        widgets = {'group': GroupAutocompleteWidget}
         labels = {
             'text': _('Post_text'),
             'group': _('Post_group')
@@ -17,6 +23,35 @@ class PostForm(forms.ModelForm):
             'group': _('Группа для поста, необязательное для заполнения поле')
         }
 
+    def _get_validation_exclusions(self):
+        # Группу уже нашло поле формы; повторная проверка внешнего
+        # ключа в модели стоила бы ещё одного запроса
+        return super()._get_validation_exclusions() + ['group']
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        # ImageField уже открыл файл: Pillow прочитал только заголовок
+        check_dimensions(image.image)
+        return process_upload(image)
+
+    def save(self, commit=True):
+        post = super().save(commit=False)
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            post.image_variants = ','.join(map(str, sorted(image.variants)))
+            post.image_placeholder = image.placeholder
+            # Файлы вариантов пишутся после сохранения поста,
+            # когда известно имя картинки в хранилище
+            post._pending_variants = image.variants
+        elif not image:
+            post.image_variants = ''
+            post.image_placeholder = ''
+        if commit:
+            post.save()
+        return post
+
 
 class CommentForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,140 @@
+"""Отметки «нравится» с разделённым счётчиком.
+
+Каждая отметка — строка ``Like`` (одна на пользователя и пост), а их
+число хранится в ``LIKE_SHARDS`` строках ``LikeCounter``: отметка
+прибавляет единицу к случайной строке, и одновременные отметки
+популярного поста почти не ждут друг друга. При чтении строки
+суммируются, а сумма кэшируется до следующей отметки: запись в кэше не
+правится через ``incr``/``decr``, поэтому не расходится с базой, даже
+если кэш сбросил её или не сохранил.
+
+Кэшированные фрагменты лент содержат кнопки отметок, поэтому в их ключе
+есть версия отметок пользователя: после своей отметки пользователь сразу
+видит новую страницу, а не фрагмент со старым состоянием кнопки.
+"""
+import random
+import time
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import Like, LikeCounter
+
+LIKE_SHARDS = 8
+LIKES_CACHE_TIMEOUT = 10 * 60
+
+
+def likes_key(post_id):
+    return f'likes:{post_id}'
+
+
+def likes_version_key(user_id):
+    return f'likes_version:{user_id}'
+
+
+def likes_version(user):
+    """Версия отметок пользователя для ключа кэша фрагментов."""
+    if not user.is_authenticated:
+        return None
+    return cache.get_or_set(likes_version_key(user.pk), time.time, None)
+
+
+def add_to_counter(post_id, delta):
+    shard = random.randrange(LIKE_SHARDS)
+    updated = LikeCounter.objects.filter(post_id=post_id, shard=shard).update(
+        count=F('count') + delta
+    )
+    if updated:
+        return
+    if delta < 0:
+        # Вычитаем из любой строки: важна только сумма. Строк нет, когда
+        # пост удаляется вместе со счётчиком, и создавать их нельзя
+        counter = LikeCounter.objects.filter(post_id=post_id).values_list(
+            'pk', flat=True
+        )[:1]
+        LikeCounter.objects.filter(pk__in=list(counter)).update(
+            count=F('count') + delta
+        )
+        return
+    LikeCounter.objects.bulk_create(
+        [LikeCounter(post_id=post_id, shard=shard)], ignore_conflicts=True
+    )
+    LikeCounter.objects.filter(post_id=post_id, shard=shard).update(
+        count=F('count') + delta
+    )
+
+
+def forget_like(post_id):
+    """Вычитает удалённую отметку из счётчика поста. Вызывается сигналом
+    при любом удалении ``Like``: снятии отметки, каскаде от пользователя
+    или поста, пачках ``core.deletion``."""
+    add_to_counter(post_id, -1)
+    cache.delete(likes_key(post_id))
+
+
+def set_like(user, post_id, liked):
+    """Ставит или снимает отметку. Повтор ничего не меняет; возвращает,
+    изменилось ли что-нибудь."""
+    try:
+        with transaction.atomic():
+            if liked:
+                Like.objects.create(user=user, post_id=post_id)
+                add_to_counter(post_id, 1)
+            # Снятую отметку вычитает из счётчика forget_like
+            elif not Like.objects.filter(
+                user=user, post_id=post_id
+            ).delete()[0]:
+                return False
+    except IntegrityError:
+        # Отметка уже есть
+        return False
+    # Сумма пересчитается из строк счётчика при чтении
+    cache.delete(likes_key(post_id))
+    cache.set(likes_version_key(user.pk), time.time(), None)
+    return True
+
+
+def like_counts(post_ids):
+    """Число отметок постов ``{post_id: count}``: из кэша, а недостающие
+    одним запросом."""
+    post_ids = list(post_ids)
+    cached = cache.get_many([likes_key(post_id) for post_id in post_ids])
+    counts = {
+        post_id: cached[likes_key(post_id)]
+        for post_id in post_ids if likes_key(post_id) in cached
+    }
+    missing = [post_id for post_id in post_ids if post_id not in counts]
+    if missing:
+        loaded = dict.fromkeys(missing, 0)
+        loaded.update(
+            LikeCounter.objects.filter(post_id__in=missing).order_by(
+            ).values_list('post_id').annotate(total=Sum('count'))
+        )
+        cache.set_many(
+            {likes_key(post_id): count for post_id, count in loaded.items()},
+            LIKES_CACHE_TIMEOUT
+        )
+        counts.update(loaded)
+    return counts
+
+
+def liked_post_ids(user, post_ids):
+    """Какие из постов отметил пользователь — одним запросом."""
+    if not user.is_authenticated:
+        return set()
+    return set(Like.objects.filter(
+        user=user, post_id__in=list(post_ids)
+    ).values_list('post_id', flat=True))
+
+
+def annotate_likes(user, posts):
+    """Проставляет карточкам страницы ``like_count`` и ``liked``."""
+    posts = list(posts)
+    post_ids = [post.pk for post in posts]
+    counts = like_counts(post_ids)
+    liked = liked_post_ids(user, post_ids)
+    for post in posts:
+        post.like_count = counts[post.pk]
+        post.liked = post.pk in liked
+    return posts
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет excerpt и has_more у существующих постов. '
+        'Посты читаются пачками по возрастанию id, каждая пачка '
+        'обновляется в отдельной транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        done = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .only('pk', 'text')[:batch_size]
+            )
+            if not batch:
+                break
+            for post in batch:
+                post.update_excerpt()
+            with transaction.atomic():
+                Post.objects.bulk_update(batch, ('excerpt', 'has_more'))
+            last_id = batch[-1].pk
+            done += len(batch)
+            self.stdout.write(f'Обработано постов: {done}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,99 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.template import Context, Template
+
+from posts.feed import COUNT_POSTS, get_feed_page
+from posts.models import Group, Post, User
+
+CARD = (
+    '{%% for post in page %%}'
+    '{{ post.author.get_full_name }} {{ post.pub_date|date:"d E Y" }}'
+    '{{ post.%s }}'
+    '{%% if post.group %%}{{ post.group.slug }}{%% endif %%}{{ post.id }}'
+    '{%% endfor %%}'
+)
+MODEL_CARD_TEMPLATE = Template(CARD % 'text')
+ROW_CARD_TEMPLATE = Template(CARD % 'excerpt')
+
+
+class FakeRequest:
+    def __init__(self, page):
+        self.GET = {'page': page}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает CPU и память на страницу ленты: модели через '
+        'select_related против лёгких карточек. Тестовые посты '
+        'создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--text-size', type=int, default=2000)
+        parser.add_argument('--pages', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['posts'], options['text_size'])
+            pages = min(
+                options['pages'], options['posts'] // COUNT_POSTS or 1
+            )
+            for name, build in (
+                ('select_related', self.model_page),
+                ('rows', self.row_page),
+            ):
+                cpu, peak = self.measure(build, pages)
+                self.stdout.write(
+                    f'{name}: {cpu * 1000:.2f} мс CPU, '
+                    f'пик памяти {peak / 1024:.1f} КиБ на страницу'
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, count, text_size):
+        author = User.objects.create(username='benchmark_feed_author')
+        group = Group.objects.create(
+            title='benchmark', slug='benchmark-feed', description=''
+        )
+        posts = [
+            Post(
+                author=author,
+                group=group if i % 2 else None,
+                text='x' * text_size,
+            )
+            for i in range(count)
+        ]
+        for post in posts:
+            post.update_excerpt()
+        Post.objects.bulk_create(posts, batch_size=500)
+
+    @staticmethod
+    def model_page(number):
+        paginator = Paginator(
+            Post.objects.select_related('group', 'author'), COUNT_POSTS
+        )
+        page = paginator.get_page(number)
+        return MODEL_CARD_TEMPLATE.render(Context({'page': page}))
+
+    @staticmethod
+    def row_page(number):
+        page = get_feed_page(FakeRequest(number), Post.objects.all())
+        return ROW_CARD_TEMPLATE.render(Context({'page': page}))
+
+    @staticmethod
+    def measure(build, pages):
+        started = time.process_time()
+        for number in range(1, pages + 1):
+            build(number)
+        cpu = (time.process_time() - started) / pages
+        peak = 0
+        for number in range(1, pages + 1):
+            tracemalloc.start()
+            build(number)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return cpu, peak
@@ -0,0 +1,136 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+
+from posts.feed import COUNT_POSTS, FEED_FIELDS
+from posts.models import Follow, Group, GroupFollow, Post, User
+from posts.subscriptions import subscriptions_page
+
+BATCH_SIZE = 1000
+# Записи последних постов всех подписок должны поместиться в кэш:
+# LocMemCache по умолчанию держит только 300 ключей
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark_follow_feed',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+
+class FakeRequest:
+    def __init__(self, page):
+        self.GET = {'page': str(page)}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время страницы ленты подписок для пользователя с '
+        'множеством подписок на авторов и группы: один запрос с OR по '
+        'двум соединениям против слияния отдельных выборок. Тестовые '
+        'данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=2000)
+        parser.add_argument('--groups', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=200000)
+        parser.add_argument('--followed-authors', type=int, default=500)
+        parser.add_argument('--followed-groups', type=int, default=100)
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 5])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    @override_settings(CACHES=BENCHMARK_CACHES)
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options)
+            for number in options['pages']:
+                for name, build in (
+                    ('OR', self.or_page),
+                    ('слияние', self.merged_page),
+                ):
+                    elapsed = self.measure(
+                        build, user, number, options['repeat']
+                    )
+                    self.stdout.write(
+                        f'страница {number}, {name}: '
+                        f'{elapsed * 1000:.2f} мс'
+                    )
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        User.objects.bulk_create(
+            User(username=f'benchmark_follow_{number}')
+            for number in range(options['authors'])
+        )
+        # bulk_create в SQLite не возвращает id
+        authors = list(User.objects.filter(
+            username__startswith='benchmark_follow_'
+        ).order_by('id'))
+        Group.objects.bulk_create(
+            Group(
+                title=f'benchmark {number}',
+                slug=f'benchmark-follow-{number}',
+                description=''
+            )
+            for number in range(options['groups'])
+        )
+        groups = list(Group.objects.filter(
+            slug__startswith='benchmark-follow-'
+        ).order_by('id'))
+        posts = []
+        for number in range(options['posts']):
+            post = Post(
+                author=authors[number * 7 % len(authors)],
+                group=groups[number * 13 % len(groups)] if number % 2
+                else None,
+                text=f'Пост {number}',
+            )
+            post.update_excerpt()
+            posts.append(post)
+            if len(posts) == BATCH_SIZE:
+                Post.objects.bulk_create(posts)
+                posts = []
+        Post.objects.bulk_create(posts)
+        user = User.objects.create(username='benchmark_follow_reader')
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author)
+            for author in authors[:options['followed_authors']]
+        )
+        GroupFollow.objects.bulk_create(
+            GroupFollow(user=user, group=group)
+            for group in groups[:options['followed_groups']]
+        )
+        return user
+
+    @staticmethod
+    def or_page(user, number):
+        paginator = Paginator(
+            Post.objects.filter(
+                Q(author__following__user=user)
+                | Q(group__followers__user=user)
+            ).distinct().order_by('-pub_date', '-id').values_list(
+                *FEED_FIELDS
+            ),
+            COUNT_POSTS
+        )
+        return list(paginator.get_page(number))
+
+    @staticmethod
+    def merged_page(user, number):
+        return list(subscriptions_page(FakeRequest(number), user))
+
+    @staticmethod
+    def measure(build, user, number, repeat):
+        # Первый вызов прогревает кэш последних постов
+        cache.clear()
+        build(user, number)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            build(user, number)
+        return (time.perf_counter() - started) / repeat
@@ -0,0 +1,42 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.suggestions import follow_matrix, numpy, suggest
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время и пик памяти расчёта предложений подписок на '
+        'случайном графе со степенным распределением подписчиков; база '
+        'не используется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200000)
+        parser.add_argument('--edges', type=int, default=2000000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if numpy is None:
+            raise CommandError('Для расчёта нужны пакеты numpy и scipy')
+        users = options['users']
+        random = numpy.random.default_rng(options['seed'])
+        followers = random.integers(0, users, options['edges'])
+        # Немногие авторы собирают большую часть подписчиков
+        authors = (random.zipf(1.5, options['edges']) * 7919) % users
+        graph = follow_matrix(followers, authors, users)
+        # Повторные рёбра складываются, а подписка бывает только одна
+        graph.data[:] = 1
+        tracemalloc.start()
+        started = time.process_time()
+        suggestions = sum(len(block[0]) for block in suggest(graph))
+        cpu = time.process_time() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{graph.nnz} подписок, {users} пользователей: '
+            f'{suggestions} предложений за {cpu:.1f} с CPU, '
+            f'пик памяти {peak / 2 ** 20:.0f} МиБ'
+        )
@@ -0,0 +1,213 @@
+import glob
+import json
+import math
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Max
+from django.urls import reverse
+
+from posts.feed import COUNT_POSTS
+from posts.models import Group, PageChange, Post, User
+from posts.static_site import init_worker, page_path, render_page
+
+OUTPUT_DIR = os.path.join(settings.BASE_DIR, 'static_site')
+STATE_FILE = '.build_state.json'
+PAGE_FILE_RE = re.compile(r'page-(\d+)\.html$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает статическую версию главной, групп, профайлов и постов '
+        'для анонимных посетителей. После первой полной сборки '
+        'перерисовываются только страницы, затронутые изменениями из '
+        'журнала PageChange.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=OUTPUT_DIR)
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересобрать все страницы, не глядя в журнал'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Сколько процессов рисуют страницы (0 — в этом процессе)'
+        )
+
+    def handle(self, *args, **options):
+        self.output = options['output']
+        state = self.load_state()
+        upto = PageChange.objects.aggregate(last=Max('id'))['last'] or 0
+        changes = PageChange.objects.filter(
+            id__gt=state.get('last_change', 0), id__lte=upto
+        )
+        full = (
+            options['full']
+            or 'last_change' not in state
+            or changes.filter(kind=PageChange.GROUP).exists()
+        )
+        if full:
+            self.clear_output()
+            jobs = self.full_jobs()
+        else:
+            jobs = self.changed_jobs(changes)
+        self.forget_cached_index()
+        written, removed = self.render(jobs, options['workers'])
+        self.save_state({'last_change': upto})
+        PageChange.objects.filter(id__lte=upto).delete()
+        self.stdout.write(
+            f'{"Полная" if full else "Частичная"} сборка: '
+            f'записано страниц {written}, удалено {removed}.'
+        )
+
+    def load_state(self):
+        try:
+            with open(os.path.join(self.output, STATE_FILE)) as state_file:
+                return json.load(state_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        os.makedirs(self.output, exist_ok=True)
+        with open(os.path.join(self.output, STATE_FILE), 'w') as state_file:
+            json.dump(state, state_file)
+
+    def clear_output(self):
+        for name in ('group', 'profile', 'posts'):
+            shutil.rmtree(os.path.join(self.output, name), ignore_errors=True)
+        for path in glob.glob(os.path.join(self.output, '*.html')):
+            os.remove(path)
+
+    def feed_jobs(self, url, posts):
+        """Все страницы ленты; лишние страницы после удалений стираются."""
+        pages = max(1, math.ceil(posts.count() / COUNT_POSTS))
+        directory = os.path.dirname(page_path(self.output, url, 1))
+        for path in glob.glob(os.path.join(directory, 'page-*.html')):
+            match = PAGE_FILE_RE.search(path)
+            if match and int(match.group(1)) > pages:
+                os.remove(path)
+        for page in range(1, pages + 1):
+            yield url, page, page_path(self.output, url, page)
+
+    def post_job(self, post_id):
+        url = reverse('posts:post_detail', args=(post_id,))
+        return url, 1, page_path(self.output, url, 1)
+
+    def full_jobs(self):
+        jobs = list(self.feed_jobs(reverse('posts:index'), Post.objects))
+        for pk, slug in Group.objects.values_list('id', 'slug'):
+            jobs.extend(self.feed_jobs(
+                reverse('posts:group_list', args=(slug,)),
+                Post.objects.filter(group_id=pk),
+            ))
+        for pk, username in User.objects.values_list('id', 'username'):
+            jobs.extend(self.feed_jobs(
+                reverse('posts:profile', args=(username,)),
+                Post.objects.filter(author_id=pk),
+            ))
+        post_ids = Post.objects.values_list('id', flat=True)
+        jobs.extend(self.post_job(pk) for pk in post_ids.iterator())
+        return jobs
+
+    def changed_jobs(self, changes):
+        post_ids, author_ids, group_ids = set(), set(), set()
+        renamed_ids, old_usernames = set(), set()
+        has_posts = False
+        for kind, post_id, author_id, group_id, username in (
+            changes.values_list(
+                'kind', 'post_id', 'author_id', 'group_id', 'username'
+            )
+        ):
+            post_ids.add(post_id)
+            if kind == PageChange.POST:
+                has_posts = True
+                author_ids.add(author_id)
+                group_ids.add(group_id)
+            elif kind == PageChange.USER:
+                author_ids.add(author_id)
+                if username:
+                    renamed_ids.add(author_id)
+                    old_usernames.add(username)
+        self.remove_profiles(old_usernames)
+        # Имя автора есть в карточках всех его постов
+        renamed_posts = Post.objects.filter(author_id__in=renamed_ids)
+        for pk, group_id in renamed_posts.values_list('id', 'group_id'):
+            has_posts = True
+            post_ids.add(pk)
+            group_ids.add(group_id)
+        jobs = []
+        if has_posts:
+            jobs.extend(self.feed_jobs(reverse('posts:index'), Post.objects))
+        groups = Group.objects.filter(id__in=group_ids)
+        for pk, slug in groups.values_list('id', 'slug'):
+            jobs.extend(self.feed_jobs(
+                reverse('posts:group_list', args=(slug,)),
+                Post.objects.filter(group_id=pk),
+            ))
+        authors = User.objects.filter(id__in=author_ids)
+        for pk, username in authors.values_list('id', 'username'):
+            jobs.extend(self.feed_jobs(
+                reverse('posts:profile', args=(username,)),
+                Post.objects.filter(author_id=pk),
+            ))
+        jobs.extend(
+            self.post_job(pk) for pk in sorted(post_ids - {None})
+        )
+        return jobs
+
+    def remove_profiles(self, usernames):
+        """Убирает профайлы удалённых и переименованных пользователей,
+        если их прежнее имя теперь никому не принадлежит."""
+        taken = set(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', flat=True))
+        for username in usernames - taken:
+            shutil.rmtree(
+                os.path.dirname(page_path(
+                    self.output,
+                    reverse('posts:profile', args=(username,)),
+                    1,
+                )),
+                ignore_errors=True,
+            )
+
+    def forget_cached_index(self):
+        """Сбрасывает кэш фрагментов главной, чтобы не отрисовать её
+        по устаревшему фрагменту. Страницы рисуются для анонима, поэтому
+        его pk и версия отметок в ключе — None."""
+        pages = max(1, math.ceil(Post.objects.count() / COUNT_POSTS))
+        cache.delete_many([
+            make_template_fragment_key(
+                'index_page', [None, None, f'<Page {page} of {pages}>']
+            )
+            for page in range(1, pages + 1)
+        ])
+
+    def render(self, jobs, workers):
+        if workers:
+            # Процессы пула открывают свои соединения с базой
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=init_worker
+            ) as executor:
+                results = list(executor.map(render_page, jobs, chunksize=8))
+        else:
+            results = [render_page(job) for job in jobs]
+        written = removed = 0
+        for path, exists in results:
+            if exists:
+                written += 1
+                continue
+            directory = os.path.dirname(path)
+            if os.path.isdir(directory):
+                shutil.rmtree(directory)
+                removed += 1
+        return written, removed
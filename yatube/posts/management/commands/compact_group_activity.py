@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import compact_activity
+
+
+class Command(BaseCommand):
+    help = (
+        'Сворачивает старые минутные интервалы активности групп в часовые '
+        'и удаляет вышедшие из окна; удобно запускать по cron.'
+    )
+
+    def handle(self, *args, **options):
+        compacted, expired = compact_activity()
+        self.stdout.write(
+            f'Свёрнуто минутных интервалов: {compacted}, '
+            f'удалено устаревших: {expired}'
+        )
@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.fields import decompress_text
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересохраняет text постов и комментариев пачками, чтобы длинные '
+        'тексты записались в сжатом виде, а записанные раньше в zstd — в '
+        'zlib. Печатает сэкономленный объём и цену распаковки при чтении.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sample', type=int, default=1000,
+            help='Сколько строк читать при замере задержки чтения'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            before = self.stored_bytes(model)
+            converted = self.convert(model, options['batch_size'])
+            after = self.stored_bytes(model)
+            read, unpack = self.read_latency(model, options['sample'])
+            self.stdout.write(
+                f'{model._meta.db_table}: пересохранено {converted}, '
+                f'объём text {before} -> {after} байт '
+                f'(сэкономлено {before - after}); {options["sample"]} '
+                f'строк: чтение {read * 1000:.2f} мс, распаковка '
+                f'{unpack * 1000:.2f} мс'
+            )
+
+    def convert(self, model, batch_size):
+        last_id = 0
+        done = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .only('pk', 'text')[:batch_size]
+            )
+            if not batch:
+                return done
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ('text',))
+            last_id = batch[-1].pk
+            done += len(batch)
+
+    @staticmethod
+    def stored_bytes(model):
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) '
+                f'FROM {table}'
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def read_latency(model, sample):
+        """Время чтения строк из базы и отдельно — распаковки тех же
+        значений, без накладных расходов ORM."""
+        table = connection.ops.quote_name(model._meta.db_table)
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT text FROM {table} ORDER BY id LIMIT %s', [sample]
+            )
+            rows = cursor.fetchall()
+        read = time.perf_counter() - started
+        started = time.perf_counter()
+        for value, in rows:
+            decompress_text(value)
+        return read, time.perf_counter() - started
@@ -0,0 +1,253 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore
+
+from core.models import StoredFile
+from core.storage import source_stem
+from posts.models import Post
+
+CURSOR_PATH = os.path.join(settings.BASE_DIR, '.media_gc_cursor.json')
+
+
+def walk_sorted(root, after=None, parts=()):
+    """Обходит дерево каталогов в порядке сортировки имён и отдаёт
+    кортежи частей пути к файлам, идущим строго после ``after``.
+
+    Поддеревья, целиком лежащие до ``after``, пропускаются без чтения,
+    поэтому продолжение обхода не зависит от числа уже пройденных файлов.
+    """
+    try:
+        entries = sorted(os.scandir(root), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        path = parts + (entry.name,)
+        if entry.is_dir(follow_symlinks=False):
+            if after and path < after[:len(path)]:
+                continue
+            yield from walk_sorted(entry.path, after, path)
+        elif not after or path > after:
+            yield path
+
+
+def split_path(path):
+    return tuple(part for part in path.split('/') if part)
+
+
+def sweep_roots(*roots):
+    """Каталоги для обхода по порядку; вложенные в другие из списка
+    обходятся вместе с ними."""
+    roots = sorted(set(roots))
+    return [
+        root for root in roots
+        if not any(
+            other != root and root[:len(other)] == other for other in roots
+        )
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из каталога картинок постов (upload_to) файлы, на которые '
+        'не ссылается ни один пост, и устаревшие миниатюры sorl-thumbnail '
+        'из THUMBNAIL_PREFIX. Остальное в MEDIA_ROOT не трогается. Обход '
+        'продолжается с места остановки по сохранённому курсору.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что было бы удалено'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей проверять между паузами'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Пауза в секундах после каждой пачки'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=0,
+            help='Остановиться после стольких проверенных записей'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=24 * 60 * 60,
+            help='Не трогать файлы моложе стольких секунд'
+        )
+        parser.add_argument('--cursor', default=CURSOR_PATH)
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать обход заново, забыв сохранённый курсор'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        image_field = Post._meta.get_field('image')
+        self.storage = image_field.storage
+        self.source_storage = ImageFile('-', self.storage).serialize_storage()
+        self.thumbnail_prefix = split_path(
+            thumbnail_settings.THUMBNAIL_PREFIX
+        )
+        self.sweep_roots = sweep_roots(
+            split_path(image_field.upload_to), self.thumbnail_prefix
+        )
+        self.checked = 0
+        self.removed = 0
+        cursor = {} if options['restart'] else self.load_cursor()
+        self.referenced = self.load_referenced()
+        finished = self.sweep_files(cursor)
+        if finished:
+            finished = self.sweep_kvstore(cursor)
+        if finished:
+            cursor = {}
+        self.save_cursor(cursor)
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'Проверено: {self.checked}. {verb}: {self.removed}. '
+            + ('Обход завершён.' if finished else 'Курсор сохранён.')
+        )
+
+    def load_referenced(self):
+        """Хэши путей без расширения, на которые есть ссылки: картинки
+        постов и файлы со счётчиком ссылок в хранилище. Без расширения —
+        чтобы варианты картинки считались занятыми вместе с ней."""
+        referenced = set()
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True)
+        for name in names.iterator(chunk_size=self.options['batch_size']):
+            referenced.add(hash(source_stem(name)))
+        stored = StoredFile.objects.filter(refcount__gt=0).values_list(
+            'name', flat=True
+        )
+        for name in stored.iterator(chunk_size=self.options['batch_size']):
+            referenced.add(hash(source_stem(name)))
+        return referenced
+
+    def load_cursor(self):
+        try:
+            with open(self.options['cursor']) as cursor_file:
+                return json.load(cursor_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_cursor(self, cursor):
+        if self.options['dry_run']:
+            return
+        with open(self.options['cursor'], 'w') as cursor_file:
+            json.dump(cursor, cursor_file)
+
+    def tick(self):
+        """Считает проверенную запись; возвращает False, когда пора
+        остановиться."""
+        self.checked += 1
+        if self.checked % self.options['batch_size'] == 0:
+            time.sleep(self.options['sleep'])
+        limit = self.options['limit']
+        return not limit or self.checked < limit
+
+    def is_fresh(self, path):
+        age = time.time() - os.path.getmtime(path)
+        return age < self.options['min_age']
+
+    def sweep_files(self, cursor):
+        after = tuple(cursor.get('path') or ()) or None
+        if cursor.get('phase') == 'kvstore':
+            return True
+        root = settings.MEDIA_ROOT
+        # Файлы вне каталога картинок постов и каталога миниатюр этой
+        # команде не принадлежат
+        for sweep_root in self.sweep_roots:
+            if after and sweep_root < after[:len(sweep_root)]:
+                continue
+            for parts in walk_sorted(
+                os.path.join(root, *sweep_root), after, sweep_root
+            ):
+                name = '/'.join(parts)
+                path = os.path.join(root, *parts)
+                is_thumbnail = (
+                    parts[:len(self.thumbnail_prefix)]
+                    == self.thumbnail_prefix
+                )
+                if not self.is_fresh(path):
+                    if is_thumbnail:
+                        self.sweep_thumbnail(name)
+                    elif hash(source_stem(name)) not in self.referenced:
+                        self.remove_original(name)
+                cursor['path'] = list(parts)
+                if not self.tick():
+                    return False
+        cursor['phase'] = 'kvstore'
+        cursor['path'] = None
+        return True
+
+    def sweep_thumbnail(self, name):
+        """Миниатюра без записи в key-value store sorl уже никому не
+        нужна: sorl её не найдёт и создаст заново."""
+        thumbnail = ImageFile(name, default.storage)
+        if default.kvstore.get(thumbnail) is None:
+            self.remove(name, thumbnail.delete)
+
+    def remove_original(self, name):
+        def delete():
+            default.kvstore.delete(ImageFile(name, self.storage))
+            StoredFile.objects.filter(name=name, refcount=0).delete()
+            self.storage.purge(name)
+
+        self.remove(name, delete)
+
+    def sweep_kvstore(self, cursor):
+        """Удаляет миниатюры исходников, которых больше нет среди
+        картинок постов, даже если сам исходник уже стёрт с диска."""
+        prefix = add_prefix('', 'thumbnails')
+        last_key = cursor.get('key') or prefix
+        while True:
+            keys = list(
+                KVStore.objects.filter(
+                    key__gt=last_key, key__startswith=prefix
+                ).order_by('key').values_list('key', flat=True)[
+                    :self.options['batch_size']
+                ]
+            )
+            if not keys:
+                cursor['key'] = None
+                return True
+            for raw_key in keys:
+                self.sweep_source(del_prefix(raw_key))
+                last_key = cursor['key'] = raw_key
+                if not self.tick():
+                    return False
+
+    def sweep_source(self, key):
+        value = KVStore.objects.filter(
+            key=add_prefix(key, 'image')
+        ).values_list('value', flat=True).first()
+        source = deserialize_image_file(value) if value else None
+        if source is not None:
+            if source.serialize_storage() != self.source_storage:
+                return
+            if hash(source_stem(source.name)) in self.referenced:
+                return
+            name = source.name
+        else:
+            source = SimpleNamespace(key=key)
+            name = f'миниатюры исходника {key}'
+        self.remove(name, lambda: default.kvstore.delete(source))
+
+    def remove(self, name, delete):
+        self.removed += 1
+        if self.options['dry_run']:
+            self.stdout.write(f'Будет удалено: {name}')
+            return
+        delete()
+        self.stdout.write(f'Удалено: {name}')
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского каталога в хранилище '
+        'с именами по хэшу содержимого и переписывает пути в базе '
+        'пачками. Старый файл удаляется, когда на него больше не '
+        'ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        last_id = 0
+        moved = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_id)
+                .exclude(image='')
+                .exclude(image__isnull=True)
+                .order_by('pk')
+                .only('pk', 'image')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].pk
+            old_names = set()
+            changed = []
+            with transaction.atomic():
+                for post in batch:
+                    name = post.image.name
+                    if storage.is_hashed_name(name):
+                        continue
+                    if not storage.exists(name):
+                        self.stderr.write(
+                            f'Пост {post.pk}: файл {name} не найден'
+                        )
+                        continue
+                    with storage.open(name) as source:
+                        post.image.name = storage.save(name, source)
+                    # bulk_update не шлёт сигналов: ссылку берём сами
+                    storage.retain(post.image.name)
+                    old_names.add(name)
+                    changed.append(post)
+                Post.objects.bulk_update(changed, ('image',))
+            for name in old_names:
+                if not Post.objects.filter(image=name).exists():
+                    storage.purge(name)
+            moved += len(changed)
+            self.stdout.write(f'Перенесено картинок: {moved}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.suggestions import numpy, update_suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает предложения подписок по графу подписок; удобно '
+        'запускать по cron раз в несколько часов.'
+    )
+
+    def handle(self, *args, **options):
+        if numpy is None:
+            raise CommandError('Для расчёта нужны пакеты numpy и scipy')
+        started = time.monotonic()
+        stored = update_suggestions()
+        self.stdout.write(
+            f'Сохранено предложений: {stored} '
+            f'за {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.popular import POPULAR_TOP, numpy, refresh_popular
+
+
+class Command(BaseCommand):
+    help = (
+        'Досчитывает оценки популярности по новым событиям и публикует '
+        'ленту «Популярное»; удобно запускать по cron раз в минуту.'
+    )
+
+    def handle(self, *args, **options):
+        ids = refresh_popular()
+        self.stdout.write(
+            f'Опубликовано {len(ids)} из {POPULAR_TOP} постов '
+            f'({"NumPy" if numpy is not None else "без NumPy"})'
+        )
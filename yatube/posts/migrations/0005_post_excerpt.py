@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_auto_20220528_0948'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='has_more',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Текст длиннее начала'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:44
+
+import core.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='text',
+            field=core.fields.CompressedTextField(help_text='Введите текст комментария', verbose_name='Текст комментария'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text',
+            field=core.fields.CompressedTextField(help_text='Введите текст поста', verbose_name='Текст поста'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:45
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('posts', '0006_compressed_text'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.HashedMediaStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+    ]
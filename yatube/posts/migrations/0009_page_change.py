@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий'), ('group', 'Группа')], max_length=10, verbose_name='Что изменилось')),
+                ('post_id', models.IntegerField(blank=True, null=True, verbose_name='Пост')),
+                ('author_id', models.IntegerField(blank=True, null=True, verbose_name='Автор поста')),
+                ('group_id', models.IntegerField(blank=True, null=True, verbose_name='Группа')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'изменение страниц',
+                'verbose_name_plural': 'изменения страниц',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:01
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+def delete_self_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Follow.objects.filter(user=models.F('author')).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_page_change'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_self_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='user_is_not_author'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:06
+
+from django.db import migrations, models
+
+FTS_TABLE = 'posts_post_fts'
+BATCH_SIZE = 1000
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            "text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        rows = Post.objects.values_list('id', 'text').iterator(
+            chunk_size=BATCH_SIZE
+        )
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                    batch
+                )
+                batch = []
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                batch
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_follow_user_is_not_author'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата публикации комментария'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата публикации'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:17
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def count_group_posts(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    counts = Group.objects.annotate(total=Count('posts')).values_list(
+        'pk', 'total'
+    )
+    for pk, total in counts:
+        Group.objects.filter(pk=pk).update(post_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_like'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.CreateModel(
+            name='GroupActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('span', models.PositiveIntegerField(verbose_name='Длина интервала, с')),
+                ('bucket', models.DateTimeField(verbose_name='Начало интервала')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Событий')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='posts.Group', verbose_name='группа')),
+            ],
+            options={
+                'verbose_name': 'активность группы',
+                'verbose_name_plural': 'активность групп',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='groupactivity',
+            index=models.Index(fields=['bucket'], name='group_activity_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='groupactivity',
+            constraint=models.UniqueConstraint(fields=('group', 'span', 'bucket'), name='group_activity'),
+        ),
+        migrations.RunPython(count_group_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_group_follow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagechange',
+            name='username',
+            field=models.CharField(blank=True, max_length=150, verbose_name='Прежнее имя пользователя'),
+        ),
+        migrations.AlterField(
+            model_name='pagechange',
+            name='kind',
+            field=models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий'), ('group', 'Группа'), ('user', 'Пользователь')], max_length=10, verbose_name='Что изменилось'),
+        ),
+    ]
@@ -1,26 +1,38 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.fields import CompressedTextField
+from core.storage import HashedMediaStorage
+
 User = get_user_model()
 
+EXCERPT_LENGTH = 300
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    # Поддерживается сигналами, чтобы каталог групп не считал посты
+    post_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self) -> str:
         return self.title
 
 
 class Post(models.Model):
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст поста',
         help_text='Введите текст поста'
     )
     pub_date = models.DateTimeField(
         'Дата публикации',
-        auto_now_add=True
+        auto_now_add=True,
+        db_index=True
     )
     author = models.ForeignKey(
         User,
@@ -41,20 +53,87 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=HashedMediaStorage(),
         null=True,
         blank=True
     )
     # Аргумент upload_to указывает директорию,
     # в которую будут загружаться пользовательские файлы.
+    # Внутри неё файлы раскладываются по хэшу содержимого.
+    # Ширины вариантов картинки для srcset через запятую и заглушка
+    image_variants = models.CharField(
+        'Ширины вариантов картинки',
+        max_length=100,
+        blank=True,
+        editable=False
+    )
+    image_placeholder = models.CharField(
+        'Заглушка картинки',
+        max_length=1000,
+        blank=True,
+        editable=False
+    )
+    # Начало текста для карточек в лентах, чтобы не читать весь text
+    excerpt = models.CharField(
+        'Начало текста',
+        max_length=EXCERPT_LENGTH,
+        blank=True,
+        editable=False
+    )
+    has_more = models.BooleanField(
+        'Текст длиннее начала',
+        default=False,
+        editable=False
+    )
+    # Счётчик копится в памяти процесса и сбрасывается в базу пачками,
+    # см. posts/counters.py
+    views = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Лента подписок читает посты авторов и групп отдельно от новых
+        # к старым; author в индексе групп отсеивает повторы без чтения
+        # таблицы
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'], name='post_author_date'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id', 'author'],
+                name='post_group_date'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def update_excerpt(self):
+        """Пересчитывает excerpt и has_more по текущему text."""
+        self.excerpt = self.text[:EXCERPT_LENGTH]
+        self.has_more = len(self.text) > EXCERPT_LENGTH
+
+    def save(self, *args, **kwargs):
+        self.update_excerpt()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # Полное сохранение не должно затирать просмотры, накопленные
+            # с момента чтения поста
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'views'
+            ]
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {
+                *update_fields, 'excerpt', 'has_more'
+            }
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -71,9 +150,10 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(
         'Дата публикации комментария',
-        auto_now_add=True
+        auto_now_add=True,
+        db_index=True
     )
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст комментария',
         help_text='Введите текст комментария'
     )
@@ -99,9 +179,211 @@ class Follow(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'author'], name='follow'),
             models.CheckConstraint(
-                check=models.Q(
-                    user=models.F('author')), name='user_is_not_author'),
+                check=~models.Q(user=models.F('author')),
+                name='user_is_not_author'
+            ),
         ]
 
     def __str__(self):
         return self.text[:15]
+
+
+class Mute(models.Model):
+    """Автор, чьи посты и комментарии пользователь не хочет видеть."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mutes',
+        verbose_name='пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='muted_by',
+        verbose_name='скрытый автор',
+    )
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'скрытый автор'
+        verbose_name_plural = 'скрытые авторы'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'], name='mute'),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='mute_user_is_not_author'
+            ),
+        ]
+
+
+class GroupFollow(models.Model):
+    """Подписка пользователя на группу: её посты попадают в ленту
+    подписок вместе с постами авторов."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows',
+        verbose_name='подписчик',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='группа',
+    )
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'подписка на группу'
+        verbose_name_plural = 'подписки на группы'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'group'], name='group_follow'
+            ),
+        ]
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='пост',
+    )
+    created = models.DateTimeField('Дата отметки', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'отметка «нравится»'
+        verbose_name_plural = 'отметки «нравится»'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='like'),
+        ]
+
+
+class LikeCounter(models.Model):
+    """Часть счётчика отметок поста.
+
+    Отметки прибавляются к случайной из ``LIKE_SHARDS`` строк, поэтому
+    одновременные отметки популярного поста не ждут блокировку одной
+    строки; число отметок — сумма по строкам (см. posts/likes.py).
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_counters',
+        verbose_name='пост',
+    )
+    shard = models.PositiveSmallIntegerField('Часть')
+    count = models.IntegerField('Отметок', default=0)
+
+    class Meta:
+        verbose_name = 'часть счётчика отметок'
+        verbose_name_plural = 'части счётчиков отметок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'shard'], name='like_counter'
+            ),
+        ]
+
+
+class GroupActivity(models.Model):
+    """Число новых постов и комментариев группы за интервал времени.
+
+    Свежие события копятся в минутных интервалах, которые
+    ``manage.py compact_group_activity`` сворачивает в часовые (см.
+    posts/trending.py).
+    """
+    MINUTE = 60
+    HOUR = 60 * 60
+
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='activity',
+        verbose_name='группа',
+    )
+    span = models.PositiveIntegerField('Длина интервала, с')
+    bucket = models.DateTimeField('Начало интервала')
+    count = models.PositiveIntegerField('Событий', default=0)
+
+    class Meta:
+        verbose_name = 'активность группы'
+        verbose_name_plural = 'активность групп'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'span', 'bucket'], name='group_activity'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['bucket'], name='group_activity_bucket'),
+        ]
+
+
+class FollowSuggestion(models.Model):
+    """Кого предложить пользователю в подписки; пересчитывается целиком
+    командой ``manage.py update_follow_suggestions``."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggested_to',
+        verbose_name='предлагаемый автор',
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'предложение подписки'
+        verbose_name_plural = 'предложения подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='follow_suggestion'
+            ),
+        ]
+
+
+class PageChange(models.Model):
+    """Журнал изменений для инкрементальной сборки статической версии
+    сайта (``manage.py build_static_site``).
+
+    Хранит идентификаторы, а не внешние ключи: запись должна пережить
+    удаление поста, группы или пользователя, чтобы сборщик убрал их
+    страницы. Для пользователя запоминается прежнее имя: по нему лежит
+    каталог его профайла.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    GROUP = 'group'
+    USER = 'user'
+    KIND_CHOICES = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+        (GROUP, 'Группа'),
+        (USER, 'Пользователь'),
+    )
+
+    kind = models.CharField('Что изменилось', max_length=10,
+                            choices=KIND_CHOICES)
+    post_id = models.IntegerField('Пост', null=True, blank=True)
+    author_id = models.IntegerField('Автор поста', null=True, blank=True)
+    group_id = models.IntegerField('Группа', null=True, blank=True)
+    username = models.CharField(
+        'Прежнее имя пользователя', max_length=150, blank=True
+    )
+    created = models.DateTimeField('Дата изменения', auto_now_add=True)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'изменение страниц'
+        verbose_name_plural = 'изменения страниц'
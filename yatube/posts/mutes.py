@@ -0,0 +1,35 @@
+"""Скрытые авторы.
+
+Множество id скрытых пользователем авторов кэшируется целиком и
+сбрасывается при скрытии и возврате автора. Ленты не добавляют его в
+запрос как ``exclude(author__in=...)``: длинный список ``NOT IN`` мешает
+читать ленту по индексу ``pub_date`` с ``LIMIT``. Вместо этого лента
+читает id постов с запасом и отбрасывает скрытых авторов в Python (см.
+``posts.feed.FilteredFeed``).
+"""
+from django.core.cache import cache
+
+from .models import Mute
+
+MUTED_CACHE_TIMEOUT = 60 * 60
+
+
+def muted_key(user_id):
+    return f'muted:{user_id}'
+
+
+def muted_ids(user):
+    if not user.is_authenticated:
+        return frozenset()
+    key = muted_key(user.pk)
+    muted = cache.get(key)
+    if muted is None:
+        muted = frozenset(Mute.objects.filter(user=user).values_list(
+            'author_id', flat=True
+        ))
+        cache.set(key, muted, MUTED_CACHE_TIMEOUT)
+    return muted
+
+
+def forget_muted(user_id):
+    cache.delete(muted_key(user_id))
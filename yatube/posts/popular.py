@@ -0,0 +1,146 @@
+"""Лента «Популярное сейчас».
+
+Оценка поста — сумма событий (публикация, комментарий, отметка) с
+весами ``EVENT_WEIGHTS``, каждое из которых затухает экспоненциально с
+периодом полураспада ``POPULAR_HALF_LIFE``. Такую сумму не нужно
+пересчитывать с нуля: к моменту ``now`` старые оценки умножаются на
+общий множитель затухания, а к ним прибавляются только события,
+случившиеся после прошлого пересчёта.
+
+Состояние — время пересчёта и оценки не больше ``POPULAR_CANDIDATES``
+кандидатов — хранится в кэше; при его потере оценки собираются заново
+по событиям за ``POPULAR_WINDOW``. События читаются пачками по
+``POPULAR_BATCH`` и считаются векторно в NumPy, а без NumPy — в цикле.
+Первые ``POPULAR_TOP`` id публикуются в кэш для ``/popular/``;
+пересчёт запускает ``manage.py update_popular`` или сама страница,
+если опубликованный список старше ``POPULAR_REFRESH``.
+"""
+import heapq
+import math
+import time
+from datetime import datetime
+from itertools import islice
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Comment, Like, Post
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+POPULAR_HALF_LIFE = 6 * 60 * 60
+POPULAR_WINDOW = 3 * 24 * 60 * 60
+POPULAR_CANDIDATES = 2000
+POPULAR_TOP = 100
+POPULAR_BATCH = 10000
+POPULAR_REFRESH = 60
+
+POPULAR_STATE_KEY = 'popular_state'
+POPULAR_KEY = 'popular_ids'
+POPULAR_LOCK_KEY = 'popular_lock'
+
+DECAY = math.log(2) / POPULAR_HALF_LIFE
+EVENT_WEIGHTS = (
+    (Post, 'pk', 'pub_date', 1.0),
+    (Comment, 'post_id', 'created', 3.0),
+    (Like, 'post_id', 'created', 1.0),
+)
+
+
+def iter_events(since, until):
+    """Пачки событий ``(post_id, timestamp, вес)`` за (since, until]."""
+    since = datetime.fromtimestamp(since, timezone.utc)
+    until = datetime.fromtimestamp(until, timezone.utc)
+    for model, post_field, time_field, weight in EVENT_WEIGHTS:
+        events = model.objects.filter(**{
+            f'{time_field}__gt': since, f'{time_field}__lte': until
+        }).order_by().values_list(post_field, time_field).iterator(
+            chunk_size=POPULAR_BATCH
+        )
+        while True:
+            batch = list(islice(events, POPULAR_BATCH))
+            if not batch:
+                break
+            yield [
+                (post_id, moment.timestamp(), weight)
+                for post_id, moment in batch
+            ]
+
+
+def merge_numpy(ids, scores, batch, now):
+    """Прибавляет к оценкам затухшие веса событий пачки."""
+    event_ids, moments, weights = (numpy.array(column) for column in zip(
+        *batch
+    ))
+    contributions = weights * numpy.exp(-DECAY * (now - moments))
+    ids, inverse = numpy.unique(
+        numpy.concatenate((ids, event_ids)), return_inverse=True
+    )
+    scores = numpy.bincount(
+        inverse, weights=numpy.concatenate((scores, contributions))
+    )
+    if len(ids) > POPULAR_CANDIDATES:
+        keep = numpy.argpartition(-scores, POPULAR_CANDIDATES)[
+            :POPULAR_CANDIDATES
+        ]
+        ids, scores = ids[keep], scores[keep]
+    return ids, scores
+
+
+def rescore_numpy(state, events, now):
+    since, ids, scores = state
+    ids = numpy.array(ids, dtype=numpy.int64)
+    scores = numpy.array(scores, dtype=float) * math.exp(
+        -DECAY * (now - since)
+    )
+    for batch in events:
+        ids, scores = merge_numpy(ids, scores, batch, now)
+    order = numpy.argsort(-scores, kind='stable')
+    return ids[order].tolist(), scores[order].tolist()
+
+
+def rescore_python(state, events, now):
+    since, ids, scores = state
+    factor = math.exp(-DECAY * (now - since))
+    totals = {pk: score * factor for pk, score in zip(ids, scores)}
+    for batch in events:
+        for pk, moment, weight in batch:
+            totals[pk] = totals.get(pk, 0) + weight * math.exp(
+                -DECAY * (now - moment)
+            )
+        if len(totals) > POPULAR_CANDIDATES:
+            totals = dict(heapq.nlargest(
+                POPULAR_CANDIDATES, totals.items(), key=lambda item: item[1]
+            ))
+    ranked = sorted(totals.items(), key=lambda item: -item[1])
+    return [pk for pk, _ in ranked], [score for _, score in ranked]
+
+
+def refresh_popular(now=None):
+    """Досчитывает оценки по новым событиям и публикует первые id."""
+    if now is None:
+        now = time.time()
+    state = cache.get(POPULAR_STATE_KEY)
+    if state is None:
+        state = (now - POPULAR_WINDOW, [], [])
+    rescore = rescore_numpy if numpy is not None else rescore_python
+    ids, scores = rescore(state, iter_events(state[0], now), now)
+    cache.set(POPULAR_STATE_KEY, (now, ids, scores), None)
+    cache.set(POPULAR_KEY, (now, ids[:POPULAR_TOP]), None)
+    return ids[:POPULAR_TOP]
+
+
+def popular_ids():
+    """Опубликованный список id; устаревший пересчитывает один запрос."""
+    published = cache.get(POPULAR_KEY)
+    if published is None:
+        return refresh_popular()
+    refreshed, ids = published
+    if time.time() - refreshed > POPULAR_REFRESH and cache.add(
+        POPULAR_LOCK_KEY, True, POPULAR_REFRESH
+    ):
+        return refresh_popular()
+    return ids
@@ -0,0 +1,146 @@
+"""Последние посты авторов и групп в кэше.
+
+Для каждого автора (и для каждой группы) в кэше лежит запись
+``(count, rows)``: число постов и кортежи колонок ``FEED_FIELDS`` не
+больше чем для ``RECENT_POSTS`` последних постов, новые первыми. Сигналы
+сбрасывают записи автора и группы при создании, правке и удалении поста;
+запись заново читается из базы по диапазону индекса (автор или группа,
+затем дата) с ``LIMIT``. Поправить запись на месте нельзя: два поста
+одного автора, сохранённые одновременно, затёрли бы правки друг друга.
+
+Первая страница профайла собирается прямо из записи автора, а первая
+страница подписок — слиянием записей всех авторов и групп, на которые
+подписан пользователь (``posts.feed.merge_streams``): первые
+``COUNT_POSTS`` постов ленты обязательно входят в последние
+``RECENT_POSTS`` постов своих источников, поэтому соединять подписки с
+постами не нужно.
+
+Названия групп в записях зависят от групп, поэтому версия в ключе
+сдвигается при любом изменении группы и старые записи перестают
+читаться.
+"""
+import time
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connection
+from django.db.models import Count
+
+from core.expressions import RawSubquery
+
+from .feed import COUNT_POSTS, FEED_FIELDS, FEED_ORDERING, make_row
+from .models import Post
+
+RECENT_POSTS = 2 * COUNT_POSTS
+# Подзапросов в одном UNION ALL; SQLite допускает не больше 500
+SOURCE_CHUNK = 200
+RECENT_POSTS_TIMEOUT = 60 * 60
+RECENT_VERSION_KEY = 'recent_posts_version'
+AUTHOR = 'author_id'
+GROUP = 'group_id'
+
+
+def recent_version():
+    return cache.get_or_set(RECENT_VERSION_KEY, time.time, None)
+
+
+def forget_all_recent():
+    cache.set(RECENT_VERSION_KEY, time.time(), None)
+
+
+def recent_key(pk, version=None, field=AUTHOR):
+    if version is None:
+        version = recent_version()
+    if field == AUTHOR:
+        return f'recent_posts:{version}:{pk}'
+    return f'recent_posts:{version}:{field}:{pk}'
+
+
+def heads_sql(field, count, columns):
+    """SQL начал ``count`` авторов (или групп), объединённых UNION ALL.
+
+    У каждого источника свой подзапрос ``ORDER BY ... LIMIT`` — диапазон
+    индекса без сортировки всех его постов. Параметры — id источника и
+    ``LIMIT`` для каждого подзапроса.
+    """
+    quote = connection.ops.quote_name
+    table = quote(Post._meta.db_table)
+    pub_date, pk, column = (
+        quote(Post._meta.get_field(name).column)
+        for name in ('pub_date', 'id', field)
+    )
+    columns = ', '.join(
+        quote(Post._meta.get_field(name).column) for name in columns
+    )
+    head = (
+        f'SELECT * FROM (SELECT {columns} FROM {table} '
+        f'WHERE {column} = %s ORDER BY {pub_date} DESC, {pk} DESC '
+        f'LIMIT %s) AS head'
+    )
+    return ' UNION ALL '.join([head] * count)
+
+
+def load_recent(ids, field=AUTHOR):
+    """Читает записи авторов (или групп) из базы: числа постов и
+    колонки последних постов каждого источника."""
+    ids = list(ids)
+    entries = {pk: (0, []) for pk in ids}
+    counts = Post.objects.filter(**{f'{field}__in': ids}).order_by(
+    ).values_list(field).annotate(count=Count('id'))
+    for pk, count in counts:
+        entries[pk] = (count, [])
+    for start in range(0, len(ids), SOURCE_CHUNK):
+        chunk = ids[start:start + SOURCE_CHUNK]
+        heads = RawSubquery(
+            heads_sql(field, len(chunk), ('id',)),
+            [value for pk in chunk for value in (pk, RECENT_POSTS)]
+        )
+        rows = Post.objects.filter(id__in=heads).order_by(
+            *FEED_ORDERING
+        ).values_list(field, *FEED_FIELDS)
+        for pk, *values in rows:
+            entries[pk][1].append(tuple(values))
+    return entries
+
+
+def get_recent(ids, field=AUTHOR):
+    """Записи ``{id: (count, rows)}``; недостающие читаются из базы и
+    кладутся в кэш."""
+    ids = list(ids)
+    version = recent_version()
+    keys = {recent_key(pk, version, field): pk for pk in ids}
+    entries = {
+        keys[key]: entry for key, entry in cache.get_many(keys).items()
+    }
+    missing = [pk for pk in ids if pk not in entries]
+    if missing:
+        loaded = load_recent(missing, field)
+        cache.set_many(
+            {recent_key(pk, version, field): entry
+             for pk, entry in loaded.items()},
+            RECENT_POSTS_TIMEOUT
+        )
+        entries.update(loaded)
+    return entries
+
+
+def forget_recent(author_id, group_ids=()):
+    """Сбрасывает записи автора и групп; они перечитаются при чтении."""
+    version = recent_version()
+    cache.delete_many([recent_key(author_id, version)] + [
+        recent_key(pk, version, GROUP) for pk in group_ids if pk is not None
+    ])
+
+
+def is_first_page(request):
+    return request.GET.get('page') in (None, '', '1')
+
+
+def first_page(rows, count, object_list):
+    """Первая страница ленты из готовых кортежей и известного числа
+    постов; остальные страницы ``paginator`` читает из ``object_list``."""
+    paginator = Paginator(object_list, COUNT_POSTS)
+    paginator.count = count
+    return Page(
+        [make_row(values) for values in rows[:COUNT_POSTS]], 1, paginator
+    )
@@ -0,0 +1,49 @@
+"""Полнотекстовый поиск по постам.
+
+Тексты постов хранятся сжатыми (см. ``core.fields``), и ``icontains``
+по ним не работает. В SQLite рядом ведётся таблица FTS5
+``posts_post_fts`` с rowid, равным id поста; её обновляют сигналы. На
+других СУБД таблицы нет, и поиск откатывается к обычному.
+"""
+from django.db import connection
+
+from core.expressions import RawSubquery
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос FTS5: все слова как префиксы, спецсимволы экранированы."""
+    return ' '.join(
+        '"{}"*'.format(term.replace('"', '""')) for term in query.split()
+    )
+
+
+def index_post(pk, text):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text) '
+            'VALUES (%s, %s)',
+            [pk, text],
+        )
+
+
+def unindex_post(pk):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def matching_post_ids(query):
+    """Подзапрос с id постов, подходящих под ``query``."""
+    return RawSubquery(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match_expression(query)],
+    )
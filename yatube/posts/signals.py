@@ -0,0 +1,261 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.generation import bump_generation
+
+from .autocomplete import forget_group_index
+from .likes import forget_like
+from .models import Comment, Group, Like, PageChange, Post, User
+from .recent import forget_all_recent, forget_recent
+from .search import index_post, unindex_post
+from .trending import record_activity
+
+# Поля пользователя, которые показываются в карточках и адресах
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def changes_author_name(update_fields):
+    return update_fields is None or bool(
+        set(AUTHOR_NAME_FIELDS) & set(update_fields)
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_stored_post(sender, instance, update_fields=None, **kwargs):
+    """Запоминает картинку и группу поста в базе до сохранения, одним
+    запросом и только если сохраняются эти поля.
+
+    Новое имя картинки известно только после сохранения, поэтому имена
+    сравниваются в ``retain_saved_image``. Страницы прежней группы тоже
+    надо пересобрать, а число постов в группах — поправить.
+    """
+    instance._stored_image = None
+    instance._old_group_id = None
+    instance._group_moved = None
+    fields = {'image', 'group'}
+    if update_fields is not None:
+        fields &= set(update_fields)
+    if not fields:
+        return
+    if instance.pk is None:
+        instance._stored_image = ''
+        return
+    old_image, old_group_id = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('image', 'group_id').first() or ('', None)
+    if 'image' in fields:
+        instance._stored_image = old_image or ''
+    if 'group' in fields and old_group_id != instance.group_id:
+        instance._old_group_id = old_group_id
+        instance._group_moved = (old_group_id, instance.group_id)
+
+
+@receiver(post_save, sender=Post)
+def retain_saved_image(sender, instance, **kwargs):
+    """Ссылки на картинки меняются в транзакции сохранения поста; та же
+    картинка, загруженная заново, счётчики не трогает."""
+    old = getattr(instance, '_stored_image', None)
+    instance._stored_image = None
+    if old is None:
+        return
+    new = instance.image.name or ''
+    if new != old:
+        instance.image.storage.retain(new)
+        instance.image.storage.release(old)
+
+
+@receiver(post_save, sender=Post)
+def save_image_variants(sender, instance, **kwargs):
+    variants = getattr(instance, '_pending_variants', None)
+    if variants and instance.image:
+        for width, content in variants.items():
+            instance.image.storage.save_variant(
+                instance.image.name, width, content
+            )
+    instance._pending_variants = None
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        instance.image.storage.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def log_post_change(sender, instance, **kwargs):
+    changes = [PageChange(
+        kind=PageChange.POST,
+        post_id=instance.pk,
+        author_id=instance.author_id,
+        group_id=instance.group_id,
+    )]
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id:
+        changes.append(PageChange(
+            kind=PageChange.POST,
+            post_id=instance.pk,
+            author_id=instance.author_id,
+            group_id=old_group_id,
+        ))
+        instance._old_group_id = None
+    PageChange.objects.bulk_create(changes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def log_comment_change(sender, instance, **kwargs):
+    PageChange.objects.create(
+        kind=PageChange.COMMENT, post_id=instance.post_id
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def log_group_change(sender, instance, **kwargs):
+    PageChange.objects.create(kind=PageChange.GROUP, group_id=instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def remember_old_username(sender, instance, update_fields=None, **kwargs):
+    """Запоминает прежнее имя, если имя пользователя меняется: после
+    переименования каталог профайла со старым именем надо убрать."""
+    instance._old_username = None
+    if instance.pk is None or not changes_author_name(update_fields):
+        return
+    old = User.objects.filter(pk=instance.pk).values_list(
+        *AUTHOR_NAME_FIELDS
+    ).first()
+    if old and old != tuple(
+        getattr(instance, name) for name in AUTHOR_NAME_FIELDS
+    ):
+        instance._old_username = old[0]
+
+
+@receiver(post_save, sender=User)
+def log_user_change(sender, instance, created, **kwargs):
+    """Новому пользователю нужна страница профайла, переименованному —
+    ещё и карточки его постов с новым именем."""
+    old_username = getattr(instance, '_old_username', None)
+    instance._old_username = None
+    if created or old_username:
+        PageChange.objects.create(
+            kind=PageChange.USER,
+            author_id=instance.pk,
+            username=old_username or '',
+        )
+
+
+@receiver(post_delete, sender=User)
+def log_user_deletion(sender, instance, **kwargs):
+    PageChange.objects.create(
+        kind=PageChange.USER,
+        author_id=instance.pk,
+        username=instance.username,
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_content_generation(sender, **kwargs):
+    """Лента, карта сайта и RSS зависят от постов и групп."""
+    bump_generation()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def reset_group_index(sender, **kwargs):
+    forget_group_index()
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        index_post(instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def update_recent_posts(sender, instance, **kwargs):
+    # Пост сменил группу: числа постов обеих групп изменились
+    forget_recent(instance.author_id, [instance.group_id, *(
+        getattr(instance, '_group_moved', None) or ()
+    )])
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_recent_posts(sender, instance, **kwargs):
+    forget_recent(instance.author_id, [instance.group_id])
+
+
+@receiver(post_save, sender=User)
+def reset_author_recent_posts(sender, instance, update_fields=None,
+                              **kwargs):
+    """Имя автора хранится в карточках его последних постов, в том
+    числе в записях групп, где он писал."""
+    if changes_author_name(update_fields):
+        forget_recent(instance.pk, Post.objects.filter(
+            author_id=instance.pk, group__isnull=False
+        ).order_by().values_list('group_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def reset_recent_posts(sender, **kwargs):
+    forget_all_recent()
+
+
+def change_post_count(group_id, delta):
+    groups = Group.objects.filter(pk=group_id)
+    if delta < 0:
+        groups = groups.filter(post_count__gt=0)
+    groups.update(post_count=F('post_count') + delta)
+
+
+@receiver(post_save, sender=Post)
+def count_group_posts(sender, instance, created, **kwargs):
+    if created:
+        moved = (None, instance.group_id)
+        record_activity(instance.group_id)
+    else:
+        moved = getattr(instance, '_group_moved', None)
+        instance._group_moved = None
+    if moved is None:
+        return
+    old, new = moved
+    if old is not None:
+        change_post_count(old, -1)
+    if new is not None:
+        change_post_count(new, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_group_post(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        change_post_count(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def record_comment_activity(sender, instance, created, **kwargs):
+    if not created:
+        return
+    # Группу поста берём из уже загруженного поста, если он есть
+    if Comment.post.is_cached(instance):
+        group_id = instance.post.group_id
+    else:
+        group_id = Post.objects.filter(pk=instance.post_id).values_list(
+            'group_id', flat=True
+        ).first()
+    record_activity(group_id)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_deleted_like(sender, instance, **kwargs):
+    forget_like(instance.post_id)
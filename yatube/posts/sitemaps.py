@@ -0,0 +1,89 @@
+"""Карта сайта: индекс и шарды со ссылками на посты.
+
+Шард ``n`` содержит посты с id от ``n * SITEMAP_SHARD_SIZE + 1`` до
+``(n + 1) * SITEMAP_SHARD_SIZE``, поэтому в нём не больше 50 000 адресов
+(лимит протокола), а граница шарда не сдвигается при удалении постов.
+Шард читается кусками по id (keyset, без OFFSET) и отдаётся потоком.
+"""
+from django.db.models import ExpressionWrapper, F, IntegerField, Max
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.html import escape
+
+from core.generation import generation_cached
+
+from .models import Post
+
+SITEMAP_SHARD_SIZE = 50000
+SITEMAP_CHUNK = 2000
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def sitemap_shards():
+    """Непустые шарды с датой последнего поста: (номер, дата)."""
+    shard = ExpressionWrapper(
+        (F('id') - 1) / SITEMAP_SHARD_SIZE, output_field=IntegerField()
+    )
+    return Post.objects.order_by().annotate(shard=shard).values(
+        'shard'
+    ).annotate(lastmod=Max('pub_date')).order_by('shard').values_list(
+        'shard', 'lastmod'
+    )
+
+
+def shard_bounds(shard):
+    low = shard * SITEMAP_SHARD_SIZE
+    return low, low + SITEMAP_SHARD_SIZE
+
+
+def iter_shard(base, shard):
+    low, high = shard_bounds(shard)
+    yield XML_HEADER + f'<urlset xmlns="{XMLNS}">\n'
+    last = low
+    while True:
+        rows = list(
+            Post.objects.filter(id__gt=last, id__lte=high).order_by(
+                'id'
+            ).values_list('id', 'pub_date')[:SITEMAP_CHUNK]
+        )
+        if not rows:
+            break
+        yield ''.join(
+            '<url><loc>{}</loc><lastmod>{}</lastmod></url>\n'.format(
+                escape(base + reverse('posts:post_detail', args=(pk,))),
+                pub_date.date().isoformat(),
+            )
+            for pk, pub_date in rows
+        )
+        last = rows[-1][0]
+    yield '</urlset>\n'
+
+
+@generation_cached
+def sitemap_index(request):
+    base = request.build_absolute_uri('/')[:-1]
+    entries = ''.join(
+        '<sitemap><loc>{}</loc><lastmod>{}</lastmod></sitemap>\n'.format(
+            escape(base + reverse('posts:sitemap_posts', args=(shard,))),
+            lastmod.date().isoformat(),
+        )
+        for shard, lastmod in sitemap_shards()
+    )
+    return StreamingHttpResponse(
+        (XML_HEADER, f'<sitemapindex xmlns="{XMLNS}">\n', entries,
+         '</sitemapindex>\n'),
+        content_type=SITEMAP_CONTENT_TYPE,
+    )
+
+
+@generation_cached
+def sitemap_posts(request, shard):
+    low, high = shard_bounds(shard)
+    if not Post.objects.filter(id__gt=low, id__lte=high).exists():
+        raise Http404
+    return StreamingHttpResponse(
+        iter_shard(request.build_absolute_uri('/')[:-1], shard),
+        content_type=SITEMAP_CONTENT_TYPE,
+    )
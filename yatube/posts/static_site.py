@@ -0,0 +1,59 @@
+"""Отрисовка страниц статической версии сайта в пуле процессов.
+
+Страница с номером 1 пишется в ``<путь>/index.html``, следующие — в
+``<путь>/page-<номер>.html``, поэтому nginx отдаёт их через
+``try_files $uri/page-$arg_page.html $uri/index.html @django``.
+
+Модуль выполняется в процессах пула, поэтому Django здесь настраивается
+в ``init_worker``, а модели и представления импортируются уже после
+этого, внутри функций.
+"""
+import os
+import tempfile
+
+import django
+
+
+def page_path(output, url, page):
+    """Файл, в который пишется страница ``page`` адреса ``url``."""
+    name = 'index.html' if page == 1 else f'page-{page}.html'
+    return os.path.join(output, url.strip('/'), name)
+
+
+def init_worker():
+    django.setup()
+
+
+def write_file(path, content):
+    """Пишет файл атомарно, чтобы nginx не отдал его недописанным."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as temp_file:
+        temp_file.write(content)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+def render_page(job):
+    """Отрисовывает страницу для анонимного посетителя.
+
+    ``job`` — кортеж (адрес, номер страницы, файл). Возвращает файл и
+    True, если страница записана, или False, если её больше нет.
+    """
+    from django.contrib.auth.models import AnonymousUser
+    from django.http import Http404
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    url, page, path = job
+    # HEAD, а не GET: сборка не посетитель, просмотры постов не считаются
+    request = RequestFactory().head(url, {'page': page} if page > 1 else {})
+    request.user = AnonymousUser()
+    match = resolve(url)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    except Http404:
+        return path, False
+    write_file(path, response.content)
+    return path, True
@@ -0,0 +1,139 @@
+"""Лента подписок: посты авторов и групп, на которые подписан
+пользователь.
+
+Один запрос ``filter(Q(author__following__user=...) |
+Q(group__followers__user=...)).distinct()`` соединяет посты сразу с двумя
+таблицами подписок, и ``OR`` по разным соединениям не даёт читать посты
+по индексу: база собирает и сортирует все подходящие посты на каждой
+странице. Вместо этого у каждого автора и каждой группы читается
+отдельный диапазон индекса (автор или группа, затем дата) с ``LIMIT``, и
+эти начала сливаются по порядку без повторов
+(``posts.feed.merge_streams``).
+
+Первая страница собирается из записей последних постов авторов и групп
+в кэше (``posts.recent``); остальные страницы и первая, если записей не
+хватило, читаются через ``posts.feed.MergedFeed``. Число постов
+складывается из чисел в записях за вычетом постов, попавших в ленту
+дважды (автор и группа из подписок), и постов скрытых авторов в группах;
+это вычитаемое кэшируется, пока не изменятся подписки и числа в записях.
+"""
+import hashlib
+from functools import partial
+
+from django.core.cache import cache
+from django.db import connection
+
+from .feed import (
+    COUNT_POSTS, MUTED_CHUNK, MergedFeed, merge_streams, paginate
+)
+from .models import Post
+from .recent import (
+    AUTHOR, GROUP, SOURCE_CHUNK, first_page, get_recent, heads_sql,
+    is_first_page
+)
+
+REPEATED_TIMEOUT = 5 * 60
+
+
+def chunked(ids, size=MUTED_CHUNK):
+    ids = sorted(ids)
+    return [ids[start:start + size] for start in range(0, len(ids), size)]
+
+
+def subscription_ids(user, muted=frozenset()):
+    """id авторов (без скрытых) и групп, на которые подписан
+    пользователь."""
+    author_ids = [
+        author_id for author_id in user.follower.order_by().values_list(
+            'author_id', flat=True
+        )
+        if author_id not in muted
+    ]
+    group_ids = list(user.group_follows.order_by().values_list(
+        'group_id', flat=True
+    ))
+    return author_ids, group_ids
+
+
+def read_heads(field, ids, limit):
+    """Первые ``limit`` постов авторов (или групп) ``ids`` как (pub_date,
+    id, author_id), новые первыми.
+
+    Начала источников читает ``heads_sql``; общая сортировка идёт только
+    по ним. pub_date остаётся в виде, в котором её вернула база: значения нужны
+    лишь для сравнения между собой.
+    """
+    sql = heads_sql(field, len(ids), ('pub_date', 'id', AUTHOR)) + (
+        ' ORDER BY 1 DESC, 2 DESC LIMIT %s'
+    )
+    params = [value for pk in ids for value in (pk, limit)] + [limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def subscription_sources(author_ids, group_ids):
+    """Источники для ``MergedFeed``: части списков авторов и групп."""
+    return [
+        partial(read_heads, AUTHOR, chunk)
+        for chunk in chunked(author_ids, SOURCE_CHUNK)
+    ] + [
+        partial(read_heads, GROUP, chunk)
+        for chunk in chunked(group_ids, SOURCE_CHUNK)
+    ]
+
+
+def repeated_count(author_ids, group_ids, muted):
+    """Посты групп, которые уже есть в ленте как посты авторов или
+    скрыты."""
+    if not group_ids:
+        return 0
+    # Авторы из подписок и скрытые авторы не пересекаются
+    authors = chunked(set(author_ids) | set(muted))
+    return sum(
+        Post.objects.filter(
+            group_id__in=groups, author_id__in=chunk
+        ).count()
+        for groups in chunked(group_ids)
+        for chunk in authors
+    )
+
+
+def cached_repeated_count(user, authors, groups, muted):
+    """``repeated_count`` из кэша. Ключ меняется вместе с подписками и
+    числами постов в записях авторов и групп: новый, удалённый или
+    перенесённый в другую группу пост меняет хотя бы одно из них."""
+    digest = hashlib.md5(repr((
+        sorted((pk, count) for pk, (count, _) in authors.items()),
+        sorted((pk, count) for pk, (count, _) in groups.items()),
+        sorted(muted),
+    )).encode()).hexdigest()
+    key = f'follow_repeated:{user.pk}:{digest}'
+    repeated = cache.get(key)
+    if repeated is None:
+        repeated = repeated_count(authors, groups, muted)
+        cache.set(key, repeated, REPEATED_TIMEOUT)
+    return repeated
+
+
+def subscriptions_page(request, user, muted=frozenset()):
+    """Страница ленты подписок пользователя."""
+    author_ids, group_ids = subscription_ids(user, muted)
+    authors = get_recent(author_ids)
+    groups = get_recent(group_ids, GROUP)
+    entries = list(authors.values()) + list(groups.values())
+    total = sum(count for count, _ in entries) - cached_repeated_count(
+        user, authors, groups, muted
+    )
+    object_list = MergedFeed(
+        subscription_sources(author_ids, group_ids), total, muted
+    )
+    if is_first_page(request):
+        rows, enough = merge_streams(
+            [(rows, count <= len(rows)) for count, rows in entries],
+            COUNT_POSTS,
+            muted,
+        )
+        if enough:
+            return first_page(rows, total, object_list)
+    return paginate(request, object_list)
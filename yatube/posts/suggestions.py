@@ -0,0 +1,168 @@
+"""Предложения подписок по графу подписок.
+
+Периодическая задача (``manage.py update_follow_suggestions``) выгружает
+``Follow`` в разреженную CSR-матрицу ``A`` (строка — подписчик, столбец —
+автор) и считает для блоков строк две оценки:
+
+* друзья друзей ``A·A`` — сколько авторов пользователя подписаны на
+  кандидата;
+* соподписчики ``(A'·A'ᵀ)·A`` — на кого подписаны пользователи с теми же
+  подписками. ``A'`` — это ``A`` без авторов, у которых больше
+  ``COFOLLOW_MAX_FOLLOWERS`` подписчиков: подписка на них мало что
+  говорит о сходстве, а произведение с ними разрастается квадратично.
+
+Из суммы оценок убираются сам пользователь и авторы, на которых он уже
+подписан, первые ``SUGGESTIONS_PER_USER`` кандидатов строки выбираются
+одной сортировкой на блок и сохраняются в ``FollowSuggestion`` — каждый
+блок в своей короткой транзакции. При показе страниц читаются только
+сохранённые предложения.
+
+Нужны NumPy и SciPy; без них команда сообщает об ошибке, а страницы
+показывают последние сохранённые предложения.
+"""
+from itertools import chain
+
+from django.db import transaction
+
+from .models import Follow, FollowSuggestion, User
+
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:
+    numpy = sparse = None
+
+SUGGESTIONS_PER_USER = 10
+SUGGESTION_BLOCK = 2000
+COFOLLOW_WEIGHT = 0.5
+COFOLLOW_MAX_FOLLOWERS = 1000
+EXPORT_CHUNK = 100000
+STORE_BATCH = 5000
+
+
+def follow_matrix(users, authors, size):
+    return sparse.csr_matrix(
+        (numpy.ones(len(users), dtype=numpy.float32), (users, authors)),
+        shape=(size, size),
+    )
+
+
+def export_follow_graph():
+    """Таблица подписок как CSR-матрица размера max(id) + 1."""
+    edges = numpy.fromiter(
+        chain.from_iterable(
+            Follow.objects.order_by().values_list(
+                'user_id', 'author_id'
+            ).iterator(chunk_size=EXPORT_CHUNK)
+        ),
+        dtype=numpy.int64,
+    ).reshape(-1, 2)
+    size = int(edges.max()) + 1 if len(edges) else 0
+    return follow_matrix(edges[:, 0], edges[:, 1], size)
+
+
+def top_per_row(rows, cols, scores, k):
+    """Первые k по оценке элементов каждой строки (тройки массивов)."""
+    order = numpy.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = numpy.arange(len(rows)) - numpy.searchsorted(rows, rows)
+    keep = rank < k
+    return rows[keep], cols[keep], scores[keep]
+
+
+def suggest(graph, k=SUGGESTIONS_PER_USER, block=SUGGESTION_BLOCK):
+    """Предложения блоками: (id пользователей, id авторов, оценки)."""
+    size = graph.shape[0]
+    followers = numpy.diff(graph.tocsc().indptr)
+    common = graph @ sparse.diags(
+        (followers <= COFOLLOW_MAX_FOLLOWERS).astype(numpy.float32)
+    )
+    common_t = common.T.tocsr()
+    for start in range(0, size, block):
+        rows = graph[start:start + block]
+        if not rows.nnz:
+            continue
+        similar = (common[start:start + block] @ common_t).tocoo()
+        # Пользователь похож сам на себя, это не соподписчик
+        other = similar.col != similar.row + start
+        similar = sparse.csr_matrix(
+            (similar.data[other], (similar.row[other], similar.col[other])),
+            shape=similar.shape,
+        )
+        scores = (rows @ graph + COFOLLOW_WEIGHT * (similar @ graph)).tocoo()
+        followed = rows.tocoo()
+        keep = (scores.col != scores.row + start) & ~numpy.isin(
+            scores.row.astype(numpy.int64) * size + scores.col,
+            followed.row.astype(numpy.int64) * size + followed.col,
+        )
+        user_ids, author_ids, values = top_per_row(
+            scores.row[keep], scores.col[keep], scores.data[keep], k
+        )
+        yield user_ids + start, author_ids, values
+
+
+def store_suggestions(blocks):
+    """Заменяет сохранённые предложения новыми; возвращает их число.
+
+    Блоки идут по возрастанию id пользователей, и каждый заменяется в
+    своей короткой транзакции: перемножение матриц идёт вне транзакции и
+    не держит блокировку записи базы, пока считается следующий блок.
+    """
+    existing = numpy.fromiter(
+        User.objects.values_list('id', flat=True).iterator(
+            chunk_size=EXPORT_CHUNK
+        ),
+        dtype=numpy.int64,
+    )
+    stored = 0
+    done = 0
+    for user_ids, author_ids, scores in blocks:
+        if not len(user_ids):
+            continue
+        last = int(user_ids.max())
+        # Пользователи могли удалиться после выгрузки графа
+        keep = numpy.isin(user_ids, existing) & numpy.isin(
+            author_ids, existing
+        )
+        with transaction.atomic():
+            # Заодно удаляются предложения пользователей между блоками,
+            # для которых ничего не нашлось
+            FollowSuggestion.objects.filter(
+                user_id__gt=done, user_id__lte=last
+            ).delete()
+            FollowSuggestion.objects.bulk_create(
+                (
+                    FollowSuggestion(
+                        user_id=user_id, author_id=author_id, score=score
+                    )
+                    for user_id, author_id, score in zip(
+                        user_ids[keep].tolist(),
+                        author_ids[keep].tolist(),
+                        scores[keep].tolist(),
+                    )
+                ),
+                batch_size=STORE_BATCH,
+            )
+        stored += int(keep.sum())
+        done = last
+    FollowSuggestion.objects.filter(user_id__gt=done).delete()
+    return stored
+
+
+def update_suggestions():
+    return store_suggestions(suggest(export_follow_graph()))
+
+
+def suggestions_for(user, limit=SUGGESTIONS_PER_USER):
+    """Сохранённые предложения для страницы: авторы по убыванию оценки."""
+    if not user.is_authenticated:
+        return []
+    return [
+        suggestion.author
+        for suggestion in FollowSuggestion.objects.filter(
+            user=user
+        ).select_related('author').only(
+            'author', 'author__username', 'author__first_name',
+            'author__last_name'
+        )[:limit]
+    ]
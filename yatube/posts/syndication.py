@@ -0,0 +1,98 @@
+"""RSS и Atom для главной, групп и профайлов авторов."""
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.html import escape
+
+from core.generation import generation_cached
+
+from .models import Group, Post, User
+
+FEED_ITEMS = 20
+TITLE_LENGTH = 60
+
+
+class LatestPostsFeed(Feed):
+    title = 'Последние обновления на сайте'
+    description = 'Новые посты Yatube'
+
+    def link(self):
+        return reverse('posts:index')
+
+    @staticmethod
+    def posts():
+        # В ленту идёт excerpt, полный сжатый text читать незачем
+        return Post.objects.select_related('author').defer('text')
+
+    def items(self):
+        return self.posts()[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return escape(item.excerpt[:TITLE_LENGTH])
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.pk,))
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return group.title
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=(group.slug,))
+
+    def items(self, group):
+        return self.posts().filter(group=group)[:FEED_ITEMS]
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Посты {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return self.title(author)
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def items(self, author):
+        return self.posts().filter(author=author)[:FEED_ITEMS]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+
+index_rss = generation_cached(LatestPostsFeed())
+index_atom = generation_cached(LatestPostsAtomFeed())
+group_rss = generation_cached(GroupPostsFeed())
+group_atom = generation_cached(GroupPostsAtomFeed())
+author_rss = generation_cached(AuthorPostsFeed())
+author_atom = generation_cached(AuthorPostsAtomFeed())
@@ -0,0 +1,37 @@
+from django import template
+from django.utils.html import format_html
+
+from posts.uploads import CARD_SIZE
+
+register = template.Library()
+
+SIZES = f'(max-width: {CARD_SIZE[0]}px) 100vw, {CARD_SIZE[0]}px'
+
+
+@register.simple_tag
+def responsive_image(post, css_class='card-img my-2'):
+    """Картинка карточки с srcset по сохранённым вариантам, ленивой
+    загрузкой и встроенной размытой заглушкой. Размеры в атрибутах
+    резервируют место под картинку до её загрузки."""
+    image = post.image
+    storage = image.storage
+    urls = [
+        (storage.url(storage.variant_name(image.name, width)), int(width))
+        for width in post.image_variants.split(',')
+        if width.isdigit()
+    ]
+    if not urls:
+        return ''
+    fitting = [url for url, width in urls if width <= CARD_SIZE[0]]
+    return format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" width="{}" '
+        'height="{}" loading="lazy" decoding="async" '
+        'style="background: center / cover no-repeat url({})" alt="">',
+        css_class,
+        fitting[-1] if fitting else urls[0][0],
+        ', '.join(f'{url} {width}w' for url, width in urls),
+        SIZES,
+        CARD_SIZE[0],
+        CARD_SIZE[1],
+        post.image_placeholder,
+    )
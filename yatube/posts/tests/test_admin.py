@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import admin as posts_admin
+from ..admin import EstimatedCountPaginator
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class AdminChangelistTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description=''
+        )
+        cls.long_post = Post.objects.create(
+            author=cls.admin,
+            group=cls.group,
+            text='Длинный пост про хомяков. ' + 'слово ' * 500,
+        )
+        posts = [
+            Post(author=cls.admin, group=cls.group, text=f'Пост {number}')
+            for number in range(150)
+        ]
+        for post in posts:
+            post.update_excerpt()
+        Post.objects.bulk_create(posts)
+        Comment.objects.bulk_create(
+            Comment(post=cls.long_post, author=cls.admin, text=f'К {number}')
+            for number in range(150)
+        )
+        Follow.objects.create(
+            user=User.objects.create(username='reader'), author=cls.admin
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists_within_budget(self):
+        """Число запросов списков админки не растёт с числом строк."""
+        for model, budget in (
+            (Post, 7), (Comment, 7), (Group, 5), (Follow, 5)
+        ):
+            url = reverse(
+                f'admin:posts_{model._meta.model_name}_changelist'
+            )
+            with self.subTest(model=model.__name__):
+                self.assertQueryBudget(self.client, url, budget)
+
+    def test_post_changelist_skips_text(self):
+        """Список постов показывает начало текста и не читает text."""
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        post = response.context['cl'].result_list[0]
+        self.assertContains(response, f'>{post.excerpt}<')
+        self.assertFalse(any(
+            '"posts_post"."text"' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+    def test_search_uses_full_text_index(self):
+        """Поиск находит слово в сжатом длинном тексте."""
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'q': 'хомяк'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.long_post]
+        )
+        # Подзапрос отдаёт все совпадения, а не только первое
+        other = Post.objects.create(author=self.admin, text='Ещё хомяк')
+        response = self.client.get(url, {'q': 'хомяк'})
+        self.assertCountEqual(
+            response.context['cl'].result_list, [self.long_post, other]
+        )
+
+    def test_paginator_estimates_large_unfiltered_tables(self):
+        posts = Post.objects.order_by('pk')
+        last_pk = posts.last().pk
+        with mock.patch.object(posts_admin, 'ESTIMATE_MIN_ROWS', 10):
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    EstimatedCountPaginator(posts, 100).count, last_pk
+                )
+        with mock.patch.object(posts_admin, 'COUNT_LIMIT', 20):
+            paginator = EstimatedCountPaginator(
+                posts.filter(group=self.group), 100
+            )
+            self.assertEqual(paginator.count, 20)
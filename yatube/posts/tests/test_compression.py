@@ -0,0 +1,102 @@
+import gzip
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core.fields import zstandard
+from core.middleware import compression
+from core.middleware.compression import CompressionMiddleware
+from core.staticfiles import brotli
+
+PAGE = '<p>Лента</p>\n' * 200
+
+
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def process(self, response, accept='gzip'):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(
+            self.factory.get('/', HTTP_ACCEPT_ENCODING=accept)
+        )
+
+    def test_page_compressed_with_preferred_encoding(self):
+        """Выбирается лучшая из принимаемых клиентом кодировок."""
+        response = self.process(HttpResponse(PAGE))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content).decode(), PAGE)
+        if brotli:
+            response = self.process(HttpResponse(PAGE), 'gzip, zstd, br')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(response.content).decode(),
+                             PAGE)
+        if zstandard:
+            response = self.process(HttpResponse(PAGE), 'gzip, zstd')
+            self.assertEqual(response['Content-Encoding'], 'zstd')
+            body = zstandard.ZstdDecompressor().decompressobj().decompress(
+                response.content
+            )
+            self.assertEqual(body.decode(), PAGE)
+
+    def test_small_and_encoded_responses_skipped(self):
+        """Короткие и уже сжатые ответы отдаются как есть."""
+        response = self.process(HttpResponse('<p>ok</p>'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        encoded = HttpResponse(gzip.compress(PAGE.encode()))
+        encoded['Content-Encoding'] = 'gzip'
+        response = self.process(encoded, 'br, gzip')
+        self.assertEqual(gzip.decompress(response.content).decode(), PAGE)
+        response = self.process(HttpResponse(PAGE), 'identity')
+        self.assertEqual(response.content.decode(), PAGE)
+
+    def test_streaming_response_compressed_by_chunks(self):
+        """Потоковый ответ сжимается по кускам, не собираясь целиком."""
+        consumed = []
+
+        def chunks():
+            for number in range(3):
+                consumed.append(number)
+                yield PAGE.encode()
+
+        response = self.process(StreamingHttpResponse(chunks()))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        stream = iter(response.streaming_content)
+        first = next(stream)
+        self.assertEqual(consumed, [0])
+        body = first + b''.join(stream)
+        self.assertEqual(gzip.decompress(body).decode(), PAGE * 3)
+
+    def test_compressed_body_reused_from_cache(self):
+        """Одинаковое тело второй раз не сжимается."""
+        with mock.patch.object(
+            compression, 'compress_body', wraps=compression.compress_body
+        ) as compress:
+            first = self.process(HttpResponse(PAGE))
+            second = self.process(HttpResponse(PAGE))
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+
+    def test_cookie_dependent_body_not_cached(self):
+        """Тела с Vary: Cookie уникальны (CSRF-токен) и не кэшируются."""
+        with mock.patch.object(
+            compression, 'compress_body', wraps=compression.compress_body
+        ) as compress:
+            for _ in range(2):
+                response = HttpResponse(PAGE)
+                response['Vary'] = 'Cookie'
+                response = self.process(response)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(compress.call_count, 2)
+
+    def test_feed_page_compressed(self):
+        response = self.client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('<title>', gzip.decompress(response.content).decode())
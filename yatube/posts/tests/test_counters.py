@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..counters import view_counter
+from ..models import Post
+
+User = get_user_model()
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        cls.post = Post.objects.create(author=author, text='Пост')
+        cls.other = Post.objects.create(author=author, text='Другой пост')
+
+    def setUp(self):
+        view_counter.flush()
+
+    def test_views_are_written_in_batches(self):
+        """Просмотры видны сразу, а в базу попадают при сбросе."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        for _ in range(3):
+            response = self.client.get(url)
+        self.assertEqual(response.context['views'], 3)
+        self.client.get(reverse('posts:post_detail', args=(self.other.pk,)))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+        self.assertEqual(view_counter.flush(), 2)
+        self.assertEqual(
+            dict(Post.objects.values_list('pk', 'views')),
+            {self.post.pk: 3, self.other.pk: 1}
+        )
+        self.assertEqual(view_counter.flush(), 0)
+        self.assertEqual(self.client.get(url).context['views'], 4)
+
+    def test_save_keeps_flushed_views(self):
+        """Сохранение поста, прочитанного до сброса, не затирает его."""
+        post = Post.objects.get(pk=self.post.pk)
+        view_counter.add(post.pk)
+        view_counter.flush()
+        post.text = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.views), ('Новый текст', 1))
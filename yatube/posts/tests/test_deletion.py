@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.deletion import run_task, schedule_deletion
+from core.models import DeletionTask
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class BackgroundDeletionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.author = User.objects.create(username='prolific')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description=''
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {number}')
+            for number in range(12)
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.admin, text='Комментарий')
+            for post in Post.objects.all()
+        )
+        Follow.objects.create(user=cls.admin, author=cls.author)
+        cls.other_post = Post.objects.create(
+            author=cls.admin, group=cls.group, text='Чужой пост'
+        )
+
+    @override_settings(DELETION_IN_BACKGROUND_THREAD=False)
+    def test_admin_action_queues_user_deletion(self):
+        """Действие админки ставит удаление в очередь, команда удаляет
+        пользователя и всё, что от него зависит, пачками."""
+        self.client.force_login(self.admin)
+        self.client.post(reverse('admin:auth_user_changelist'), {
+            'action': 'delete_in_background',
+            ACTION_CHECKBOX_NAME: [self.author.pk],
+        })
+        task = DeletionTask.objects.get()
+        self.assertEqual(task.status, DeletionTask.PENDING)
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+        call_command(
+            'process_deletions', '--batch-size', '5', '--sleep', '0',
+            stdout=StringIO()
+        )
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.DONE)
+        # 12 комментариев, 12 постов, подписка и сам пользователь
+        self.assertEqual((task.deleted, task.total), (26, 26))
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertFalse(Follow.objects.exists())
+        self.assertTrue(Post.objects.filter(pk=self.other_post.pk).exists())
+
+    def test_group_deletion_keeps_posts(self):
+        """Посты удаляемой группы остаются, ссылка на группу обнуляется."""
+        task = schedule_deletion(self.group)
+        self.assertTrue(run_task(task, batch_size=5, pause=0))
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 13)
+
+    def test_running_task_not_duplicated_or_rerun(self):
+        """Для выполняющейся задачи не создаётся вторая, и её не берёт
+        никто другой, пока её явно не вернут в очередь."""
+        task = schedule_deletion(self.group)
+        DeletionTask.objects.filter(pk=task.pk).update(
+            status=DeletionTask.RUNNING
+        )
+        self.assertEqual(schedule_deletion(self.group).pk, task.pk)
+        self.assertIsNone(run_task(task, pause=0))
+        call_command('process_deletions', '--sleep', '0', stdout=StringIO())
+        self.assertTrue(Group.objects.exists())
+        call_command(
+            'process_deletions', '--sleep', '0', '--requeue-running',
+            stdout=StringIO()
+        )
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.DONE)
+        self.assertEqual(DeletionTask.objects.count(), 1)
+        self.assertFalse(Group.objects.exists())
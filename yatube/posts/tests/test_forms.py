@@ -3,12 +3,15 @@ import tempfile
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Group, Post
 
+from ..autocomplete import AUTOCOMPLETE_LIMIT
+from ..forms import PostForm
 from ..models import Group, Post
 
 User = get_user_model()
@@ -89,7 +92,7 @@ class PostCreateFormTests(TestCase):
             Post.objects.filter(
                 text='Тестовый текст',
                 group=self.group.id,
-                image='posts/small.gif'
+                image__endswith='.webp'
             ).exists()
         )
         post = Post.objects.latest('id')
@@ -114,3 +117,59 @@ class PostCreateFormTests(TestCase):
         )
         self.assertEqual(post.text, dict_data['text'])
         self.assertEqual(post.group.title, self.group.title)
+
+
+class GroupAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user')
+        Group.objects.bulk_create(
+            Group(title=title, slug=f'group-{number}', description='')
+            for number, title in enumerate(
+                ['Кошки', 'кошатники', 'Собаки']
+                + [f'Коты {i}' for i in range(30)]
+            )
+        )
+        cls.group = Group.objects.filter(title='Собаки').first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_form_renders_only_selected_group(self):
+        """Форма не выводит список групп, а валидация ищет группу по
+        первичному ключу."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group
+        )
+        response = self.client.get(
+            reverse('posts:post_update', args=(post.pk,))
+        )
+        self.assertNotContains(response, '<option')
+        self.assertContains(response, 'value="Собаки"')
+        form = PostForm(data={'text': 'Пост', 'group': self.group.pk})
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['group'], self.group)
+
+    def test_autocomplete_by_prefix(self):
+        """Подсказки ищутся по началу названия без учёта регистра и
+        сбрасываются при изменении групп."""
+        url = reverse('posts:group_autocomplete')
+        titles = {
+            item['title']
+            for item in self.client.get(url, {'q': 'кош'}).json()['results']
+        }
+        self.assertEqual(titles, {'Кошки', 'кошатники'})
+        self.assertEqual(
+            len(self.client.get(url, {'q': 'ко'}).json()['results']),
+            AUTOCOMPLETE_LIMIT,
+        )
+        with self.assertNumQueries(0):
+            self.client.get(url, {'q': 'соб'})
+        Group.objects.create(title='Кошачьи', slug='cats', description='')
+        titles = {
+            item['title']
+            for item in self.client.get(url, {'q': 'коша'}).json()['results']
+        }
+        self.assertEqual(titles, {'Кошачьи', 'кошатники'})
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..feed import FEED_ORDERING
+from ..models import Follow, Group, GroupFollow, Mute, Post
+
+User = get_user_model()
+
+
+class GroupFollowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username='reader')
+        cls.followed = User.objects.create(username='followed')
+        cls.stranger = User.objects.create(username='stranger')
+        cls.muted = User.objects.create(username='muted')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description=''
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description=''
+        )
+        # Посты автора из подписок в группе из подписок попадают в обе
+        # выборки, посты скрытого автора в группе — ни в одну
+        authors = (cls.followed, cls.stranger, cls.muted)
+        groups = (cls.group, cls.other_group, None)
+        posts = [
+            Post(
+                author=authors[number % 3],
+                group=groups[number // 3 % 3],
+                text=f'Пост {number}',
+            )
+            for number in range(90)
+        ]
+        # Второй автор из подписок: источники читаются одним UNION ALL
+        cls.second = User.objects.create(username='second')
+        posts.extend(
+            Post(author=cls.second, text=f'Пост второго {number}')
+            for number in range(15)
+        )
+        for post in posts:
+            post.update_excerpt()
+        Post.objects.bulk_create(posts)
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author)
+            for author in (cls.followed, cls.second)
+        )
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+        Mute.objects.create(user=cls.reader, author=cls.muted)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def expected_ids(self):
+        return list(Post.objects.filter(
+            Q(author__following__user=self.reader)
+            | Q(group__followers__user=self.reader)
+        ).exclude(author=self.muted).distinct().order_by(
+            *FEED_ORDERING
+        ).values_list('id', flat=True))
+
+    def feed_ids(self):
+        ids = []
+        number = 1
+        while True:
+            response = self.client.get(
+                reverse('posts:follow_index'), {'page': number}
+            )
+            page_obj = response.context['page_obj']
+            ids.extend(post.id for post in page_obj)
+            if not page_obj.has_next():
+                return ids, page_obj.paginator.count
+            number += 1
+
+    def test_feed_matches_union(self):
+        """Лента совпадает с объединением подписок в базе: без повторов,
+        в том же порядке и с тем же числом постов."""
+        expected = self.expected_ids()
+        # Второй обход читает первую страницу из кэша
+        for _ in range(2):
+            ids, count = self.feed_ids()
+            self.assertEqual(ids, expected)
+            self.assertEqual(count, len(expected))
+
+    def test_no_join_with_subscriptions(self):
+        """Посты читаются по диапазону индекса каждого источника без
+        соединения с подписками; число повторов берётся из кэша."""
+        self.feed_ids()
+        for page in (1, 2):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('posts:follow_index'), {'page': page})
+            sqls = [query['sql'] for query in queries.captured_queries]
+            for sql in sqls:
+                if '"posts_post"' in sql:
+                    self.assertNotIn('"posts_follow"', sql)
+                    self.assertNotIn('"posts_groupfollow"', sql)
+                self.assertNotIn('COUNT(', sql)
+            self.assertEqual(
+                any(') AS head' in sql for sql in sqls), page == 2
+            )
+
+    def test_group_posts_follow_changes(self):
+        self.feed_ids()
+        post = Post.objects.create(
+            author=self.stranger, group=self.group, text='Новый пост'
+        )
+        first = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(first.context['page_obj'][0].id, post.id)
+        post.group = self.other_group
+        post.save()
+        ids, count = self.feed_ids()
+        self.assertNotIn(post.id, ids)
+        self.assertEqual(ids, self.expected_ids())
+        self.assertEqual(count, len(ids))
+
+    def test_follow_and_unfollow(self):
+        url = reverse('posts:group_follow', args=(self.other_group.slug,))
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertRedirects(
+                response,
+                reverse('posts:group_list', args=(self.other_group.slug,))
+            )
+        self.assertEqual(
+            GroupFollow.objects.filter(
+                user=self.reader, group=self.other_group
+            ).count(),
+            1
+        )
+        response = self.client.get(
+            reverse('posts:group_list', args=(self.other_group.slug,))
+        )
+        self.assertTrue(response.context['following'])
+        self.client.get(
+            reverse('posts:group_unfollow', args=(self.other_group.slug,))
+        )
+        self.assertFalse(GroupFollow.objects.filter(
+            user=self.reader, group=self.other_group
+        ).exists())
+        response = self.client.get(
+            reverse('posts:group_follow', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+
+from core.deletion import run_task, schedule_deletion
+
+from ..likes import LIKE_SHARDS, like_counts
+from ..models import Like, LikeCounter, Post
+
+User = get_user_model()
+
+
+class LikeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.other = Post.objects.create(author=cls.author, text='Другой')
+        cls.fans = [
+            User.objects.create(username=f'fan{number}')
+            for number in range(20)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:post_like', args=(self.post.pk,))
+
+    def like(self, user, value):
+        self.client.force_login(user)
+        return self.client.post(self.url, {'like': value})
+
+    def test_like_is_idempotent(self):
+        """Повторная отметка и повторное снятие ничего не меняют."""
+        fan = self.fans[0]
+        for _ in range(2):
+            response = self.like(fan, '1')
+            self.assertRedirects(
+                response, reverse('posts:post_detail', args=(self.post.pk,))
+            )
+        self.assertEqual(Like.objects.filter(user=fan).count(), 1)
+        self.assertEqual(like_counts([self.post.pk]), {self.post.pk: 1})
+        for _ in range(2):
+            self.like(fan, '0')
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(like_counts([self.post.pk]), {self.post.pk: 0})
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_counter_is_sharded(self):
+        """Отметки расходятся по частям счётчика, сумма и кэш сходятся."""
+        for fan in self.fans:
+            self.like(fan, '1')
+        counters = LikeCounter.objects.filter(post=self.post)
+        self.assertLessEqual(counters.count(), LIKE_SHARDS)
+        self.assertGreater(counters.count(), 1)
+        self.assertEqual(
+            counters.aggregate(total=Sum('count'))['total'], len(self.fans)
+        )
+        self.assertEqual(
+            like_counts([self.post.pk])[self.post.pk], len(self.fans)
+        )
+        response = self.client.post(
+            self.url, {'like': '0'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(
+            response.json(), {'liked': False, 'likes': len(self.fans) - 1}
+        )
+
+    def test_feed_marks_liked_posts(self):
+        """Отметки пользователя для страницы ленты читаются разом."""
+        fan = self.fans[0]
+        self.like(fan, '1')
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        marks = {
+            post.pk: (post.like_count, post.liked)
+            for post in response.context['page_obj']
+        }
+        self.assertEqual(
+            marks, {self.post.pk: (1, True), self.other.pk: (0, False)}
+        )
+
+    def test_cached_feed_shows_own_like(self):
+        """Фрагмент главной в кэше не прячет только что поставленную
+        отметку: повторный клик снимает её, а не повторяет."""
+        fan = self.fans[0]
+        self.client.force_login(fan)
+        index = reverse('posts:index')
+        self.client.get(index)
+        response = self.client.post(
+            self.url, {'like': '1', 'next': index}, follow=True
+        )
+        html = response.content.decode()
+        self.assertIn('name="like" value="0"', html)
+        self.assertIn('&#9829; 1', html)
+        self.client.post(self.url, {'like': '0', 'next': index})
+        self.assertFalse(Like.objects.exists())
+
+    def test_deleted_users_likes_uncounted(self):
+        """Отметки удалённых пользователей вычитаются из счётчика и при
+        каскаде, и при удалении пачками; пост удаляется вместе со
+        счётчиком."""
+        for fan in self.fans[:3]:
+            self.like(fan, '1')
+        self.assertEqual(like_counts([self.post.pk])[self.post.pk], 3)
+        User.objects.get(pk=self.fans[0].pk).delete()
+        self.assertEqual(like_counts([self.post.pk])[self.post.pk], 2)
+        self.assertTrue(run_task(
+            schedule_deletion(self.fans[1]), batch_size=1, pause=0
+        ))
+        self.assertEqual(like_counts([self.post.pk])[self.post.pk], 1)
+        Post.objects.get(pk=self.post.pk).delete()
+        self.assertFalse(LikeCounter.objects.filter(
+            post_id=self.post.pk
+        ).exists())
+
+    def test_anonymous_cannot_like(self):
+        response = self.client.post(self.url, {'like': '1'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Like.objects.exists())
@@ -0,0 +1,357 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models.sql.compiler import SQLInsertCompiler
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from core.models import StoredFile
+
+from ..models import Post
+from ..uploads import MAX_STORED_SIZE
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class HashedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые загрузки лежат в одном файле в шардированном
+        каталоге, счётчик ссылок считает посты."""
+        first = self.create_post('one.gif')
+        second = self.create_post('two.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}'
+        )
+        self.assertEqual(
+            StoredFile.objects.get(name=first.image.name).refcount, 2
+        )
+
+    def run_media_gc(self, **options):
+        cursor = os.path.join(TEMP_MEDIA_ROOT, 'media_gc.json')
+        call_command(
+            'media_gc', min_age=0, cursor=cursor, stdout=StringIO(), **options
+        )
+
+    def test_media_gc_removes_orphans(self):
+        """media_gc удаляет картинки без постов, в режиме dry-run
+        ничего не трогает."""
+        storage = Post._meta.get_field('image').storage
+        with self.settings(MEDIA_ROOT=tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)):
+            post = self.create_post()
+            orphan = storage._save('posts/orphan.gif', ContentFile(b'x'))
+            # Чужие файлы вне каталога картинок постов не трогаются
+            foreign = [
+                storage._save(name, ContentFile(b'x'))
+                for name in ('avatars/user.gif', 'robots.txt')
+            ]
+            self.run_media_gc(dry_run=True)
+            self.assertTrue(storage.exists(orphan))
+            self.run_media_gc()
+            self.assertFalse(storage.exists(orphan))
+            self.assertTrue(storage.exists(post.image.name))
+            for name in foreign:
+                self.assertTrue(storage.exists(name))
+
+    def test_media_gc_removes_stale_thumbnails(self):
+        """media_gc удаляет миниатюры картинки, которой нет у постов,
+        даже если сам исходник уже стёрт."""
+        with self.settings(MEDIA_ROOT=tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)):
+            post = self.create_post()
+            thumbnail = get_thumbnail(post.image, '10x10')
+            self.assertTrue(thumbnail.exists())
+            Post.objects.filter(pk=post.pk).update(image='')
+            StoredFile.objects.all().delete()
+            post.image.storage.purge(post.image.name)
+            self.run_media_gc()
+            self.assertFalse(thumbnail.exists())
+
+    def test_media_gc_resumes_from_cursor(self):
+        """С --limit обход останавливается и продолжается с курсора."""
+        storage = Post._meta.get_field('image').storage
+        with self.settings(MEDIA_ROOT=tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)):
+            names = [
+                storage._save(f'posts/orphan{i}.gif', ContentFile(b'x'))
+                for i in range(3)
+            ]
+            self.run_media_gc(limit=1)
+            self.assertEqual(
+                [storage.exists(name) for name in names],
+                [False, True, True]
+            )
+            self.run_media_gc()
+            self.assertFalse(any(storage.exists(name) for name in names))
+
+    def test_relocate_media(self):
+        """relocate_media переносит плоские файлы в хэшированные пути."""
+        storage = Post._meta.get_field('image').storage
+        flat = storage._save('posts/flat.gif', ContentFile(SMALL_GIF))
+        post = Post.objects.create(author=self.user, text='Старый пост')
+        Post.objects.filter(pk=post.pk).update(image=flat)
+        call_command('relocate_media', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(storage.is_hashed_name(post.image.name))
+        self.assertTrue(storage.exists(post.image.name))
+        self.assertFalse(storage.exists(flat))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ServeMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        storage = Post._meta.get_field('image').storage
+        cls.name = storage.save('posts/small.gif', ContentFile(SMALL_GIF))
+        cls.url = reverse('media', kwargs={'path': cls.name})
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_response(self):
+        """Файл отдаётся целиком с ETag и неизменяемым кэшированием."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), SMALL_GIF)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        not_modified = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_range_response(self):
+        """Запрос с Range получает 206 и только нужные байты."""
+        size = len(SMALL_GIF)
+        cases = {
+            'bytes=0-5': (SMALL_GIF[:6], f'bytes 0-5/{size}'),
+            'bytes=-4': (
+                SMALL_GIF[-4:], f'bytes {size - 4}-{size - 1}/{size}'
+            ),
+            'bytes=40-': (SMALL_GIF[40:], f'bytes 40-{size - 1}/{size}'),
+        }
+        for header, (body, content_range) in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b''.join(response.streaming_content), body)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(int(response['Content-Length']), len(body))
+        response = self.client.get(self.url, HTTP_RANGE='bytes=500-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_front_server_handoff(self):
+        """За nginx Django отдаёт только заголовок X-Accel-Redirect."""
+        with self.settings(MEDIA_SERVE_BACKEND='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/' + self.name
+        )
+
+    def test_unknown_paths_not_served(self):
+        """Файлы вне разрешённых каталогов и чужие пути не отдаются."""
+        for path in ('posts/missing.gif', 'posts/../cursor.json', '.hidden'):
+            with self.subTest(path=path):
+                response = self.client.get('/media/' + path)
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    @staticmethod
+    def jpeg(size):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(
+            buffer, 'JPEG', exif=exif.tobytes()
+        )
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue())
+
+    def test_large_upload_is_downscaled_and_stripped(self):
+        """Большая картинка уменьшается и сохраняется в WebP без EXIF."""
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с фото', 'image': self.jpeg((4000, 1000))},
+        )
+        post = Post.objects.get(text='Пост с фото')
+        self.assertTrue(post.image.name.endswith('.webp'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size[0], MAX_STORED_SIZE[0])
+            self.assertNotIn('exif', image.info)
+
+    def test_upload_creates_responsive_variants(self):
+        """При загрузке создаются варианты по ширине и заглушка, лента
+        выводит srcset и ленивую загрузку."""
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с фото', 'image': self.jpeg((1000, 800))},
+        )
+        post = Post.objects.get(text='Пост с фото')
+        self.assertEqual(post.image_variants, '320,640,960')
+        self.assertTrue(post.image_placeholder.startswith('data:image/'))
+        storage = post.image.storage
+        for width in (320, 640, 960):
+            name = storage.variant_name(post.image.name, width)
+            with storage.open(name) as variant, Image.open(variant) as image:
+                self.assertEqual(image.size[0], width)
+        html = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn('srcset=', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn(post.image_placeholder, html)
+        storage.purge(post.image.name)
+        self.assertFalse(
+            storage.exists(storage.variant_name(post.image.name, 320))
+        )
+
+    def test_too_many_pixels_rejected(self):
+        """Картинка с слишком большим размером в заголовке отклоняется."""
+        with mock.patch('posts.uploads.MAX_SOURCE_PIXELS', 100):
+            response = self.client.post(
+                reverse('posts:post_create'),
+                {'text': 'Огромная', 'image': self.jpeg((20, 20))},
+            )
+        self.assertFalse(Post.objects.filter(text='Огромная').exists())
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    def test_truncated_upload_rejected(self):
+        """Обрезанный JPEG проходит проверку заголовка, но не
+        декодируется: ошибка формы вместо 500."""
+        data = self.jpeg((400, 300)).read()
+        for workers in (0, 1):
+            with self.subTest(workers=workers), override_settings(
+                IMAGE_PROCESS_WORKERS=workers
+            ):
+                response = self.client.post(
+                    reverse('posts:post_create'),
+                    {
+                        'text': 'Обрезанная',
+                        'image': SimpleUploadedFile(
+                            'photo.jpg', data[:len(data) // 2]
+                        ),
+                    },
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(
+                    response.context['form'].has_error('image', 'corrupt')
+                )
+        self.assertFalse(Post.objects.filter(text='Обрезанная').exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ReleaseImageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_file_removed_with_last_reference(self):
+        """Файл удаляется с диска после коммита, когда удалён последний
+        пост с ним."""
+        user = User.objects.create(username='user')
+        posts = [
+            Post.objects.create(
+                author=user,
+                text='Пост с картинкой',
+                image=SimpleUploadedFile('small.gif', SMALL_GIF),
+            )
+            for _ in range(2)
+        ]
+        path = posts[0].image.path
+        posts[0].delete()
+        self.assertTrue(os.path.exists(path))
+        posts[1].delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_reference_follows_post_save(self):
+        """Ссылку на файл держит только сохранённый пост: неудачная
+        запись не оставляет её, а та же картинка, загруженная заново, её не
+        удваивает."""
+        user = User.objects.create(username='user')
+
+        def create_post():
+            return Post.objects.create(
+                author=user,
+                text='Пост с картинкой',
+                image=SimpleUploadedFile('small.gif', SMALL_GIF),
+            )
+
+        execute_sql = SQLInsertCompiler.execute_sql
+
+        def failed_insert(compiler, *args, **kwargs):
+            if compiler.query.model is not Post:
+                return execute_sql(compiler, *args, **kwargs)
+            # Файл сохраняется, пока собирается INSERT
+            compiler.as_sql()
+            raise DatabaseError
+
+        with mock.patch.object(
+            SQLInsertCompiler, 'execute_sql', failed_insert
+        ):
+            with self.assertRaises(DatabaseError):
+                create_post()
+        self.assertFalse(StoredFile.objects.filter(refcount__gt=0).exists())
+        post = create_post()
+        for _ in range(2):
+            post.image = SimpleUploadedFile('again.gif', SMALL_GIF)
+            post.save()
+        self.assertEqual(
+            StoredFile.objects.get(name=post.image.name).refcount, 1
+        )
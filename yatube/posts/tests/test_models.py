@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import EXCERPT_LENGTH, Group, Post
 
 User = get_user_model()
 
@@ -32,3 +36,38 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, 'Тестовая группа')
+
+    def test_excerpt_follows_text(self):
+        """excerpt и has_more пересчитываются при сохранении поста."""
+        post = Post.objects.create(author=self.user, text='а' * 1000)
+        self.assertEqual(post.excerpt, 'а' * EXCERPT_LENGTH)
+        self.assertTrue(post.has_more)
+        post.text = 'Короткий текст'
+        post.save(update_fields=('text',))
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Короткий текст')
+        self.assertFalse(post.has_more)
+
+    def test_backfill_excerpts(self):
+        """Команда backfill_excerpts заполняет excerpt у старых постов."""
+        Post.objects.filter(pk=self.post.pk).update(excerpt='')
+        call_command('backfill_excerpts', batch_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.excerpt, self.post.text)
+
+    def test_long_text_is_stored_compressed(self):
+        """Длинный текст хранится сжатым и читается без изменений."""
+        text = 'Длинный текст поста. ' * 200
+        post = Post.objects.create(author=self.user, text=text)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT typeof(text), length(text), hex(substr(text, 1, 1)) '
+                'FROM posts_post WHERE id = %s', [post.pk]
+            )
+            kind, size, marker = cursor.fetchone()
+        self.assertEqual(kind, 'blob')
+        # Один кодек везде, установлен zstandard или нет
+        self.assertEqual(marker, '01')
+        self.assertLess(size, len(text.encode()))
+        self.assertEqual(Post.objects.get(pk=post.pk).text, text)
+        self.assertTrue(Post.objects.filter(text=text).exists())
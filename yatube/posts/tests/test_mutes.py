@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..feed import COUNT_POSTS
+from ..models import Comment, Follow, Group, Mute, Post
+
+User = get_user_model()
+
+
+class MuteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username='reader')
+        cls.noisy = User.objects.create(username='noisy')
+        cls.quiet = User.objects.create(username='quiet')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description=''
+        )
+        # Посты скрытого автора перемежаются с обычными
+        posts = [
+            Post(
+                author=cls.noisy if number % 3 else cls.quiet,
+                group=cls.group,
+                text=f'Пост {number}',
+            )
+            for number in range(60)
+        ]
+        for post in posts:
+            post.update_excerpt()
+        Post.objects.bulk_create(posts)
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author)
+            for author in (cls.noisy, cls.quiet)
+        )
+        cls.post = Post.objects.filter(author=cls.quiet).first()
+        Comment.objects.create(post=cls.post, author=cls.noisy, text='Шум')
+        Comment.objects.create(post=cls.post, author=cls.quiet, text='Тишь')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+        self.client.post(
+            reverse('posts:profile_mute', args=(self.noisy.username,))
+        )
+
+    def pages(self, url):
+        pages = []
+        number = 1
+        while True:
+            response = self.client.get(url, {'page': number})
+            page_obj = response.context['page_obj']
+            pages.append([post.author.username for post in page_obj])
+            if not page_obj.has_next():
+                return pages, page_obj.paginator.count
+            number += 1
+
+    def test_feeds_skip_muted_authors(self):
+        """Ленты без скрытого автора: полные страницы без повторов."""
+        self.assertEqual(Mute.objects.count(), 1)
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                pages, count = self.pages(url)
+                self.assertEqual(count, 20)
+                self.assertEqual(
+                    [len(page) for page in pages], [COUNT_POSTS] * 2
+                )
+                self.assertEqual(
+                    {name for page in pages for name in page}, {'quiet'}
+                )
+
+    def test_comments_and_unmute(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        response = self.client.get(url)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Тишь']
+        )
+        self.client.post(
+            reverse('posts:profile_unmute', args=(self.noisy.username,))
+        )
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['comments']), 2)
+        pages, count = self.pages(reverse('posts:index'))
+        self.assertEqual(count, 60)
@@ -0,0 +1,79 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import popular
+from ..models import Comment, Like, Post
+
+User = get_user_model()
+
+
+class PopularFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.readers = [
+            User.objects.create(username=f'reader{number}')
+            for number in range(3)
+        ]
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий')
+        cls.discussed = Post.objects.create(
+            author=cls.author, text='Обсуждаемый'
+        )
+        cls.liked = Post.objects.create(author=cls.author, text='Любимый')
+
+    def setUp(self):
+        cache.clear()
+
+    def scores(self):
+        _, ids, scores = cache.get(popular.POPULAR_STATE_KEY)
+        return dict(zip(ids, scores))
+
+    def add_activity(self):
+        Comment.objects.bulk_create(
+            Comment(post=self.discussed, author=reader, text='Да')
+            for reader in self.readers
+        )
+        Like.objects.bulk_create(
+            Like(post=self.liked, user=reader) for reader in self.readers
+        )
+
+    def test_ranking_and_view(self):
+        """Комментарии весят больше отметок, отметки — больше тишины."""
+        self.add_activity()
+        expected = [self.discussed.pk, self.liked.pk, self.quiet.pk]
+        self.assertEqual(popular.refresh_popular(), expected)
+        response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']], expected
+        )
+
+    def test_incremental_update_matches_full_rescore(self):
+        """Досчёт по новым событиям даёт те же оценки, что пересчёт
+        с нуля, с NumPy и без него."""
+        for module_numpy in (popular.numpy, None):
+            with self.subTest(numpy=module_numpy is not None), \
+                    mock.patch.object(popular, 'numpy', module_numpy):
+                cache.clear()
+                Comment.objects.all().delete()
+                Like.objects.all().delete()
+                popular.refresh_popular()
+                self.add_activity()
+                now = time.time() + 3600
+                popular.refresh_popular(now)
+                incremental = self.scores()
+                cache.clear()
+                popular.refresh_popular(now)
+                full = self.scores()
+                self.assertEqual(incremental.keys(), full.keys())
+                for pk, score in full.items():
+                    self.assertAlmostEqual(incremental[pk], score)
+
+    def test_published_list_is_reused(self):
+        popular.refresh_popular()
+        with self.assertNumQueries(0):
+            popular.popular_ids()
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+AUTHORS = 20
+GROUPS = 5
+POSTS = 300
+COMMENTS = 100
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Число запросов страниц не зависит от объёма данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        User.objects.bulk_create(
+            User(username=f'author{number}') for number in range(AUTHORS)
+        )
+        authors = list(User.objects.filter(username__startswith='author'))
+        Group.objects.bulk_create(
+            Group(title=f'Группа {number}', slug=f'group{number}',
+                  description='')
+            for number in range(GROUPS)
+        )
+        groups = list(Group.objects.all())
+        posts = [
+            Post(
+                author=authors[number % AUTHORS],
+                group=groups[number % GROUPS] if number % 3 else None,
+                text=f'Пост {number}',
+            )
+            for number in range(POSTS)
+        ]
+        for post in posts:
+            post.update_excerpt()
+        Post.objects.bulk_create(posts)
+        cls.post = Post.objects.filter(group__isnull=False).first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=authors[number % AUTHORS],
+                    text=f'Комментарий {number}')
+            for number in range(COMMENTS)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author) for author in authors
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.post.author)
+
+    def test_views_within_budget(self):
+        post = self.post
+        # К запросам авторизованного клиента добавляются сессия и
+        # пользователь, к лентам — суммы отметок (пока их нет в кэше)
+        # и отметки самого пользователя, к главной — популярные группы,
+        # к профайлу и подпискам — предложения подписок, к первому
+        # запросу пользователя — его скрытые авторы, к группе — подписка
+        # на неё, к подпискам — список групп из подписок
+        budgets = {
+            reverse('posts:index'): 8,
+            reverse('posts:group_list', args=(post.group.slug,)): 8,
+            reverse('posts:profile', args=(post.author.username,)): 8,
+            reverse('posts:post_detail', args=(post.pk,)): 6,
+            reverse('posts:follow_index'): 5,
+            reverse('posts:post_create'): 3,
+            reverse('posts:post_update', args=(post.pk,)): 4,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client, url, budget)
+        self.client.force_login(self.reader)
+        # Без кэша последние посты авторов читаются двумя запросами,
+        # дальше остаются только списки подписок на авторов и группы
+        self.assertQueryBudget(
+            self.client, reverse('posts:follow_index'), 9
+        )
+        self.assertQueryBudget(
+            self.client, reverse('posts:follow_index'), 6
+        )
+        self.assertQueryBudget(
+            self.client, reverse('posts:profile', args=(post.author,)), 7
+        )
@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+from ..feed import FEED_ORDERING
+from ..recent import RECENT_POSTS, get_recent, recent_key
+
+User = get_user_model()
+
+
+class RecentPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(4)
+        ]
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description=''
+        )
+        posts = [
+            Post(author=cls.authors[number % 3], group=cls.group,
+                 text=f'Пост {number}')
+            for number in range(40)
+        ]
+        for post in posts:
+            post.update_excerpt()
+        Post.objects.bulk_create(posts)
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author)
+            for author in cls.authors[:2]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def page_ids(self, url):
+        response = self.client.get(url)
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_follow_page_is_merged_without_join(self):
+        """Первая страница подписок совпадает с выборкой из базы и
+        собирается без соединения подписок с постами."""
+        url = reverse('posts:follow_index')
+        expected = list(Post.objects.filter(
+            author__following__user=self.reader
+        ).order_by(*FEED_ORDERING).values_list('id', flat=True)[:10])
+        self.assertEqual(self.page_ids(url), expected)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(
+            response.context['page_obj'].paginator.count,
+            Post.objects.filter(author__in=self.authors[:2]).count()
+        )
+        for query in queries.captured_queries:
+            self.assertFalse(
+                'posts_follow' in query['sql']
+                and 'posts_post' in query['sql'], query['sql']
+            )
+
+    def test_profile_follows_changes(self):
+        """Создание, правка и удаление поста и смена группы сразу видны
+        на первой странице профайла."""
+        author = self.authors[3]
+        url = reverse('posts:profile', args=(author.username,))
+        self.assertEqual(self.page_ids(url), [])
+        post = Post.objects.create(
+            author=author, group=self.group, text='Первый'
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.context['posts_count'], 1)
+        self.assertContains(response, 'Первый')
+        post.text = 'Исправленный'
+        post.save()
+        self.assertContains(self.client.get(url), 'Исправленный')
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertContains(
+            self.client.get(url),
+            reverse('posts:group_list', args=('renamed',))
+        )
+        post.delete()
+        response = self.client.get(url)
+        self.assertEqual(response.context['posts_count'], 0)
+        self.assertNotContains(response, 'Исправленный')
+
+    def test_later_pages_read_database(self):
+        url = reverse('posts:profile', args=(self.authors[0].username,))
+        ids = list(self.authors[0].posts.order_by(
+            *FEED_ORDERING
+        ).values_list('id', flat=True))
+        self.assertEqual(self.page_ids(url), ids[:10])
+        self.assertEqual(self.page_ids(url + '?page=2'), ids[10:])
+
+    def test_cold_entry_reads_index_range(self):
+        """Запись автора читается подзапросом с LIMIT на каждого
+        автора, а новый пост сбрасывает её, а не правит на месте."""
+        author = self.authors[0]
+        with CaptureQueriesContext(connection) as queries:
+            count, rows = get_recent([author.pk])[author.pk]
+        self.assertTrue(any(
+            ') AS head' in query['sql'] for query in queries.captured_queries
+        ))
+        ids = list(author.posts.order_by(*FEED_ORDERING).values_list(
+            'id', flat=True
+        ))
+        self.assertEqual(count, len(ids))
+        self.assertEqual([row[0] for row in rows], ids[:RECENT_POSTS])
+        Post.objects.create(author=author, text='Новый')
+        self.assertIsNone(cache.get(recent_key(author.pk)))
@@ -0,0 +1,92 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.staticfiles import brotli
+
+STYLE = b'.card { margin: 0 auto; padding: 1rem; }\n' * 40
+
+
+class PrecompressedStaticTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'app.css'), 'wb') as f:
+            f.write(STYLE)
+        # Манифест должен покрывать статику из шаблонов страниц
+        os.makedirs(os.path.join(self.source, 'img'))
+        with open(os.path.join(self.source, 'img', 'logo.png'), 'wb') as f:
+            f.write(b'logo')
+        overrides = self.settings(
+            STATICFILES_DIRS=(self.source,), STATIC_ROOT=self.root
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed = staticfiles_storage.stored_name('css/app.css')
+
+    def get(self, name, **extra):
+        return self.client.get(settings.STATIC_URL + name, **extra)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic кладёт файл с хэшем в имени и сжатые копии."""
+        self.assertRegex(self.hashed, r'^css/app\.[0-9a-f]{12}\.css$')
+        self.assertEqual(
+            staticfiles_storage.url('css/app.css'),
+            settings.STATIC_URL + self.hashed,
+        )
+        suffixes = ['.gz'] + (['.br'] if brotli else [])
+        for suffix in suffixes:
+            self.assertTrue(
+                os.path.exists(os.path.join(self.root, self.hashed + suffix))
+            )
+
+    def test_missing_manifest_entry_raises(self):
+        """Файла нет в собранном манифесте — ошибка, а не имя без хэша;
+        без манифеста отдаётся имя как есть."""
+        with self.assertRaises(ValueError):
+            staticfiles_storage.url('css/missing.css')
+        os.remove(os.path.join(self.root, staticfiles_storage.manifest_name))
+        self.assertEqual(
+            staticfiles_storage.url('css/missing.css'),
+            settings.STATIC_URL + 'css/missing.css',
+        )
+
+    def test_precompressed_file_served_by_accept_encoding(self):
+        """Клиенту отдаётся сжатая копия, которую он принимает."""
+        response = self.get(self.hashed, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(
+            response['Cache-Control'], 'public, max-age=31536000, immutable'
+        )
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), STYLE)
+        if brotli:
+            response = self.get(
+                self.hashed, HTTP_ACCEPT_ENCODING='gzip, br'
+            )
+            self.assertEqual(response['Content-Encoding'], 'br')
+            body = b''.join(response.streaming_content)
+            self.assertEqual(brotli.decompress(body), STYLE)
+        response = self.get(self.hashed, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), STYLE)
+
+    def test_unhashed_name_is_revalidated(self):
+        """Имя без хэша не кэшируется как неизменяемое."""
+        response = self.get('css/app.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        response.close()
+        self.assertEqual(self.get('css/missing.css').status_code, 404)
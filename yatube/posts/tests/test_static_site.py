@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..counters import view_counter
+from ..models import Group, PageChange, Post
+
+User = get_user_model()
+
+
+class BuildStaticSiteTests(TestCase):
+    def setUp(self):
+        self.output = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Первый пост'
+        )
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(10)
+        )
+
+    def build(self, *args):
+        out = StringIO()
+        call_command(
+            'build_static_site', '--output', self.output, '--workers', '0',
+            *args, stdout=out
+        )
+        return out.getvalue()
+
+    def path(self, *parts):
+        return os.path.join(self.output, *parts)
+
+    def read(self, *parts):
+        with open(self.path(*parts), encoding='utf-8') as page:
+            return page.read()
+
+    def test_full_build_writes_public_pages(self):
+        """Первая сборка пишет ленты по страницам и страницы постов."""
+        self.assertIn('Полная', self.build())
+        for parts in (
+            ('index.html',),
+            ('page-2.html',),
+            ('group', 'group', 'index.html'),
+            ('profile', 'author', 'page-2.html'),
+            ('profile', 'reader', 'index.html'),
+            ('posts', str(self.post.pk), 'index.html'),
+        ):
+            self.assertTrue(os.path.exists(self.path(*parts)), parts)
+        self.assertIn('Первый пост', self.read('group', 'group', 'index.html'))
+        self.assertFalse(PageChange.objects.exists())
+
+    def test_incremental_build_renders_changed_pages(self):
+        """Повторная сборка трогает только затронутые изменением
+        страницы и убирает страницы удалённых постов."""
+        self.build()
+        untouched = self.path('profile', 'reader', 'index.html')
+        os.utime(untouched, (0, 0))
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertIn('Частичная', self.build())
+        self.assertIn(
+            'Исправленный',
+            self.read('posts', str(self.post.pk), 'index.html'),
+        )
+        self.assertEqual(os.path.getmtime(untouched), 0)
+        self.post.delete()
+        self.build()
+        self.assertFalse(os.path.exists(self.path('posts', str(self.post.pk))))
+        self.assertFalse(os.path.exists(self.path('page-2.html')))
+        self.assertNotIn('Исправленный', self.read('index.html'))
+
+    def test_user_rename_and_deletion(self):
+        """Переименование перерисовывает карточки и переносит профайл,
+        удаление пользователя убирает его профайл."""
+        self.build()
+        self.author.username = 'writer'
+        self.author.first_name = 'Новое'
+        self.author.save()
+        self.build()
+        self.assertFalse(os.path.exists(self.path('profile', 'author')))
+        self.assertTrue(
+            os.path.exists(self.path('profile', 'writer', 'page-2.html'))
+        )
+        self.assertIn('Новое', self.read('index.html'))
+        self.assertIn(
+            'Новое', self.read('posts', str(self.post.pk), 'index.html')
+        )
+        self.reader.delete()
+        self.build()
+        self.assertFalse(os.path.exists(self.path('profile', 'reader')))
+
+    def test_build_does_not_count_views(self):
+        views = view_counter.get(self.post.pk)
+        self.build()
+        self.assertEqual(view_counter.get(self.post.pk), views)
@@ -0,0 +1,99 @@
+from io import StringIO
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Follow, FollowSuggestion
+from ..suggestions import (
+    follow_matrix, numpy, store_suggestions, suggest
+)
+
+User = get_user_model()
+
+
+@skipIf(numpy is None, 'нужны numpy и scipy')
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create(username=name)
+            for name in ('ann', 'bob', 'cat', 'dan', 'eve')
+        }
+        edges = (
+            ('ann', 'bob'), ('bob', 'cat'), ('bob', 'dan'),
+            ('eve', 'bob'), ('eve', 'ann'),
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.users[user], author=cls.users[author])
+            for user, author in edges
+        )
+
+    def test_scores(self):
+        """Друзья друзей и соподписчики, без себя и уже подписанных."""
+        graph = follow_matrix(
+            numpy.array([0, 1, 1, 3]), numpy.array([1, 2, 3, 1]), 4
+        )
+        suggestions = {}
+        for users, authors, scores in suggest(graph, k=1, block=3):
+            for user, author, score in zip(users, authors, scores):
+                suggestions[int(user)] = (int(author), float(score))
+        # 0 и 3 подписаны на 1, а 1 — на 2 и 3; 0 похож на 3
+        self.assertEqual(suggestions, {0: (2, 1.0), 3: (2, 1.0)})
+
+    def test_blocks_stored_outside_transaction(self):
+        """Блоки считаются вне транзакции записи и заменяют предложения
+        своего диапазона пользователей, включая пропущенных."""
+        ann, bob, cat, dan, eve = (
+            self.users[name] for name in ('ann', 'bob', 'cat', 'dan', 'eve')
+        )
+        FollowSuggestion.objects.bulk_create(
+            FollowSuggestion(user=user, author=dan, score=1)
+            for user in (ann, bob, cat, eve)
+        )
+        depth = len(connection.savepoint_ids)
+
+        def blocks():
+            for user in (ann, cat):
+                self.assertEqual(len(connection.savepoint_ids), depth)
+                yield (
+                    numpy.array([user.pk]), numpy.array([eve.pk]),
+                    numpy.array([2.0], dtype=numpy.float32),
+                )
+
+        self.assertEqual(store_suggestions(blocks()), 2)
+        self.assertEqual(
+            set(FollowSuggestion.objects.values_list('user', 'author')),
+            {(ann.pk, eve.pk), (cat.pk, eve.pk)}
+        )
+
+    def test_command_and_pages(self):
+        """Команда сохраняет предложения, страницы их только читают,
+        подписка убирает предложение."""
+        out = StringIO()
+        call_command('update_follow_suggestions', stdout=out)
+        ann = self.users['ann']
+        self.assertEqual(
+            set(FollowSuggestion.objects.filter(user=ann).values_list(
+                'author__username', flat=True
+            )),
+            {'cat', 'dan'}
+        )
+        self.assertFalse(FollowSuggestion.objects.filter(
+            author__in=[self.users['bob'], ann], user=ann
+        ).exists())
+        self.client.force_login(ann)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            {author.username for author in response.context['suggestions']},
+            {'cat', 'dan'}
+        )
+        self.client.get(reverse('posts:profile_follow', args=('cat',)))
+        response = self.client.get(reverse('posts:profile', args=('ann',)))
+        self.assertEqual(
+            [author.username for author in response.context['suggestions']],
+            ['dan']
+        )
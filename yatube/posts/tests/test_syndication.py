@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.checks import shared_cache_check
+
+from .. import sitemaps
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост номер {n}'
+            )
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def read(self, response):
+        if response.streaming:
+            return b''.join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def test_feeds(self):
+        """RSS и Atom есть у главной, групп и авторов."""
+        for name, args, content_type in (
+            ('posts:index_rss', (), 'application/rss+xml'),
+            ('posts:index_atom', (), 'application/atom+xml'),
+            ('posts:group_rss', ('group',), 'application/rss+xml'),
+            ('posts:group_atom', ('group',), 'application/atom+xml'),
+            ('posts:author_rss', ('author',), 'application/rss+xml'),
+            ('posts:author_atom', ('author',), 'application/atom+xml'),
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=args))
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(
+                    response['Content-Type'].startswith(content_type)
+                )
+                self.assertIn('Пост номер 2', self.read(response))
+        response = self.client.get(reverse('posts:group_rss', args=('no',)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get_and_generation_cache(self):
+        """Повтор с ETag получает 304, повтор без него — ответ из кэша;
+        новый пост меняет поколение."""
+        url = reverse('posts:index_rss')
+        response = self.client.get(url)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Свежий пост', self.read(response))
+
+    def test_process_local_cache_reported(self):
+        """Поколение в кэше процесса не увидят другие процессы."""
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+        }}):
+            self.assertEqual(shared_cache_check(None), [])
+        warnings = shared_cache_check(None)
+        self.assertEqual([warning.id for warning in warnings], ['core.W001'])
+
+    def test_sitemap_shards(self):
+        """Посты раскладываются по шардам по id; шард отдаётся потоком."""
+        first_id = self.posts[0].pk
+        with mock.patch.object(sitemaps, 'SITEMAP_SHARD_SIZE', 2):
+            index = self.read(self.client.get(reverse('posts:sitemap')))
+            shards = sorted({(pk - 1) // 2 for pk in (
+                post.pk for post in self.posts
+            )})
+            for shard in shards:
+                self.assertIn(f'/sitemap-posts-{shard}.xml', index)
+            response = self.client.get(
+                reverse('posts:sitemap_posts', args=(shards[0],))
+            )
+            self.assertTrue(response.streaming)
+            shard = self.read(response)
+            self.assertIn(f'/posts/{first_id}/</loc>', shard)
+            self.assertLessEqual(shard.count('<url>'), 2)
+            response = self.client.get(
+                reverse('posts:sitemap_posts', args=(shards[-1] + 1,))
+            )
+            self.assertEqual(response.status_code, 404)
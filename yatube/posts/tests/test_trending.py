@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Group, GroupActivity, Post
+from ..trending import bucket_start, compact_activity, record_activity
+
+User = get_user_model()
+
+
+class TrendingGroupsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.calm = Group.objects.create(
+            title='Спокойная', slug='calm', description=''
+        )
+        cls.busy = Group.objects.create(
+            title='Оживлённая', slug='busy', description=''
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counters_follow_posts_and_comments(self):
+        """Число постов группы и её активность обновляются сигналами."""
+        post = Post.objects.create(
+            author=self.author, group=self.busy, text='Пост'
+        )
+        Comment.objects.create(post=post, author=self.author, text='Да')
+        Post.objects.create(author=self.author, group=self.calm, text='Пост')
+        activity = dict(GroupActivity.objects.values_list('group', 'count'))
+        self.assertEqual(activity, {self.busy.pk: 2, self.calm.pk: 1})
+        post.group = self.calm
+        post.save()
+        self.assertEqual(
+            dict(Group.objects.values_list('slug', 'post_count')),
+            {'busy': 0, 'calm': 2}
+        )
+        post.delete()
+        self.calm.refresh_from_db()
+        self.assertEqual(self.calm.post_count, 1)
+        response = self.client.get(reverse('posts:trending_groups'))
+        self.assertEqual(
+            [group['slug'] for group in response.json()['results']],
+            ['busy', 'calm']
+        )
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertContains(response, 'Постов: 1')
+
+    def test_compaction(self):
+        """Старые минуты сворачиваются в часы, вышедшие из окна
+        удаляются, свежие остаются минутными."""
+        now = timezone.now()
+        for minutes in (1, 125, 126, 30 * 60):
+            record_activity(self.busy.pk, now - timedelta(minutes=minutes))
+        compacted, expired = compact_activity(now)
+        self.assertEqual(compacted, 3)
+        self.assertGreaterEqual(expired, 1)
+        rows = sorted(GroupActivity.objects.values_list('span', 'count'))
+        hour = bucket_start(now - timedelta(minutes=125), GroupActivity.HOUR)
+        if hour != bucket_start(
+            now - timedelta(minutes=126), GroupActivity.HOUR
+        ):
+            self.assertEqual(rows, [(60, 1), (3600, 1), (3600, 1)])
+        else:
+            self.assertEqual(rows, [(60, 1), (3600, 2)])
@@ -5,13 +5,16 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.db.models.fields.files import ImageFieldFile
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts.feed import PostRow
 from posts.forms import PostForm
 
-from ..models import Comment, Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -69,10 +72,11 @@ class PostViewsTest(TestCase):
         """Вспомогательная функция"""
         if obj == 'page_obj':
             post = response.context.get(obj).object_list[0]
+            self.assertEqual(post.excerpt, self.post.text)
         else:
             post = response.context.get('post_number')
+            self.assertEqual(post.text, self.post.text)
         self.assertEqual(post.author, self.user)
-        self.assertEqual(post.text, self.post.text)
         self.assertEqual(post.group, self.post.group)
 
     def test_index_page_has_correct_context(self):
@@ -81,6 +85,21 @@ class PostViewsTest(TestCase):
         response = self.authorized_client.get(reverse('posts:index'))
         self.additional_function(response, 'page_obj')
 
+    def test_feed_pages_use_rows(self):
+        """Ленты передают в шаблон лёгкие карточки, а не модели"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                post = response.context['page_obj'][0]
+                self.assertIsInstance(post, PostRow)
+                self.assertEqual(post, self.post)
+                self.assertEqual(str(post.author), self.user.username)
+
     def test_group_post_has_correct_context(self):
         """Проверяем что group_post передаёт правильный контекст"""
         response = self.authorized_client.get(
@@ -310,3 +329,69 @@ class CommentImages(TestCase):
             kwargs={'username': self.user.username}))
         response = self.authorized_client.post(reverse('posts:follow_index'))
         self.assertEqual(len(response.context.get('paje_obj'), count_follow))
+
+
+class WriteQueriesTest(TestCase):
+    """Изменяющие представления укладываются в один запрос на запись.
+
+    К каждому запросу авторизованного клиента добавляются два чтения:
+    сессия и пользователь.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_follow_is_idempotent_insert(self):
+        url = reverse('posts:profile_follow', args=(self.author.username,))
+        # Поиск автора, вставка с пропуском повтора и удаление
+        # предложения подписаться на него
+        for _ in range(2):
+            with self.assertNumQueries(5):
+                self.client.get(url)
+        self.assertEqual(self.user.follower.count(), 1)
+        with self.assertNumQueries(2):
+            self.client.get(
+                reverse('posts:profile_follow', args=(self.user.username,))
+            )
+        self.assertEqual(self.user.follower.count(), 1)
+
+    def test_unfollow_is_single_delete(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        url = reverse('posts:profile_unfollow', args=(self.author.username,))
+        for _ in range(2):
+            with self.assertNumQueries(3):
+                self.client.get(url)
+        self.assertFalse(self.user.follower.exists())
+
+    def test_comment_reads_only_post_group(self):
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        # Группа поста (заодно проверка, что он есть), вставка
+        # комментария и запись в журнал изменений страниц
+        with self.assertNumQueries(5):
+            self.client.post(url, {'text': 'Комментарий'})
+        self.assertTrue(
+            Comment.objects.filter(post=self.post, author=self.user).exists()
+        )
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk + 100,)),
+            {'text': 'Комментарий'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_save_reads_stored_fields_once(self):
+        """Картинка и группа в базе читаются перед сохранением одним
+        запросом и не читаются, если эти поля не сохраняются."""
+        post = Post.objects.get(pk=self.post.pk)
+        for update_fields, reads in ((None, 1), (['text'], 0)):
+            with CaptureQueriesContext(connection) as queries:
+                post.save(update_fields=update_fields)
+            self.assertEqual(len([
+                query for query in queries.captured_queries
+                if query['sql'].startswith('SELECT')
+                and 'FROM "posts_post"' in query['sql']
+            ]), reads)
@@ -0,0 +1,22 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в бюджет SQL-запросов."""
+
+    def assertQueryBudget(self, client, url, budget):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        queries = context.captured_queries
+        if len(queries) > budget:
+            listing = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(queries, 1)
+            )
+            self.fail(
+                f'{url}: {len(queries)} запросов при бюджете {budget}:\n'
+                f'{listing}'
+            )
+        return response
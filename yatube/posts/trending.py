@@ -0,0 +1,107 @@
+"""Популярные группы по активности за скользящее окно.
+
+Каждый новый пост и комментарий прибавляет единицу к минутному
+интервалу ``GroupActivity`` своей группы. ``compact_activity``
+(``manage.py compact_group_activity``, раз в несколько минут)
+сворачивает минутные интервалы старше ``MINUTE_BUCKETS_FOR`` в часовые
+и удаляет интервалы, целиком вышедшие из окна ``TRENDING_WINDOW``.
+Так на группу приходится не больше сотни строк, и сумма за окно
+считается по ним, а не по ``posts_post``. Список первых групп
+кэшируется на ``TRENDING_CACHE_TIMEOUT``.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import GroupActivity
+
+TRENDING_WINDOW = timedelta(hours=24)
+MINUTE_BUCKETS_FOR = timedelta(hours=1)
+TRENDING_LIMIT = 10
+TRENDING_KEY = 'trending_groups'
+TRENDING_CACHE_TIMEOUT = 60
+
+
+def bucket_start(moment, span):
+    if span == GroupActivity.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+def add_to_bucket(group_id, span, bucket, count):
+    rows = GroupActivity.objects.filter(
+        group_id=group_id, span=span, bucket=bucket
+    )
+    if not rows.update(count=F('count') + count):
+        GroupActivity.objects.bulk_create(
+            [GroupActivity(group_id=group_id, span=span, bucket=bucket)],
+            ignore_conflicts=True
+        )
+        rows.update(count=F('count') + count)
+
+
+def record_activity(group_id, moment=None):
+    if group_id is None:
+        return
+    if moment is None:
+        moment = timezone.now()
+    add_to_bucket(
+        group_id,
+        GroupActivity.MINUTE,
+        bucket_start(moment, GroupActivity.MINUTE),
+        1
+    )
+
+
+def compact_activity(now=None):
+    """Сворачивает старые минутные интервалы в часовые и удаляет
+    вышедшие из окна; возвращает (свёрнуто, удалено)."""
+    if now is None:
+        now = timezone.now()
+    # Час сворачивается целиком, когда все его минуты старше порога
+    cutoff = bucket_start(now - MINUTE_BUCKETS_FOR, GroupActivity.HOUR)
+    with transaction.atomic():
+        minutes = GroupActivity.objects.select_for_update().filter(
+            span=GroupActivity.MINUTE, bucket__lt=cutoff
+        )
+        hours = Counter()
+        pks = []
+        for pk, group_id, bucket, count in minutes.values_list(
+            'pk', 'group_id', 'bucket', 'count'
+        ):
+            hours[group_id, bucket_start(bucket, GroupActivity.HOUR)] += count
+            pks.append(pk)
+        for (group_id, bucket), count in hours.items():
+            add_to_bucket(group_id, GroupActivity.HOUR, bucket, count)
+        GroupActivity.objects.filter(pk__in=pks).delete()
+        expired, _ = GroupActivity.objects.filter(
+            bucket__lt=now - TRENDING_WINDOW
+        ).delete()
+    return len(pks), expired
+
+
+def trending_groups(limit=TRENDING_LIMIT):
+    """Самые активные за окно группы: словари slug, title, activity."""
+    groups = cache.get(TRENDING_KEY)
+    if groups is None:
+        groups = list(
+            GroupActivity.objects.filter(
+                bucket__gte=timezone.now() - TRENDING_WINDOW
+            ).values('group__slug', 'group__title').annotate(
+                activity=Sum('count')
+            ).order_by('-activity', 'group__title')[:TRENDING_LIMIT]
+        )
+        groups = [
+            {
+                'slug': group['group__slug'],
+                'title': group['group__title'],
+                'activity': group['activity'],
+            }
+            for group in groups
+        ]
+        cache.set(TRENDING_KEY, groups, TRENDING_CACHE_TIMEOUT)
+    return groups[:limit]
@@ -0,0 +1,167 @@
+"""Обработка картинок, загружаемых к постам.
+
+Размер проверяется по заголовку файла ещё до декодирования. JPEG
+декодируется сразу в уменьшенном масштабе (draft mode), картинка
+уменьшается до ``MAX_STORED_SIZE`` и пересохраняется в WebP (или в JPEG,
+если Pillow собран без WebP) без EXIF и прочих метаданных. Сама работа
+с пикселями идёт в пуле процессов, чтобы поток запроса не держал GIL.
+
+Там же готовятся варианты для карточек ленты нескольких ширин (для
+``srcset``) и крошечная заглушка, которая показывается размытой, пока
+грузится сама картинка.
+"""
+import base64
+import io
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as ProcessTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps, features
+
+MAX_SOURCE_PIXELS = 50 * 1000 * 1000
+MAX_STORED_SIZE = (1920, 1920)
+# Карточки в лентах показывают картинку в кадре 960x339
+CARD_SIZE = (960, 339)
+VARIANT_WIDTHS = (320, 640, 960, 1280)
+PLACEHOLDER_WIDTH = 16
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+PROCESS_TIMEOUT = 30
+# Заголовок может быть целым, а данные — нет: Pillow падает только при
+# декодировании
+DECODE_ERRORS = (OSError, Image.DecompressionBombError, ValueError)
+
+ProcessedImage = namedtuple(
+    'ProcessedImage', ('data', 'ext', 'variants', 'placeholder')
+)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # fork в процессе с потоками (сброс просмотров, фоновые
+        # удаления) может унаследовать захваченные ими блокировки
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context('forkserver'),
+        )
+    return _executor
+
+
+def check_dimensions(image):
+    """Проверяет размер по уже прочитанному заголовку картинки."""
+    width, height = image.size
+    if width * height > MAX_SOURCE_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)s×%(height)s пикселей',
+            code='too_large',
+            params={'width': width, 'height': height},
+        )
+
+
+def encode(image, has_alpha, quality=None):
+    """Кодирует картинку в WebP или JPEG; возвращает (байты, расширение)."""
+    out = io.BytesIO()
+    if features.check('webp'):
+        image.convert('RGBA' if has_alpha else 'RGB').save(
+            out, 'WEBP', quality=quality or WEBP_QUALITY, method=4
+        )
+        return out.getvalue(), '.webp'
+    image.convert('RGB').save(
+        out, 'JPEG', quality=quality or JPEG_QUALITY,
+        optimize=True, progressive=True
+    )
+    return out.getvalue(), '.jpg'
+
+
+def card_crop(image, width):
+    """Кадрирует по центру в пропорции карточки ленты."""
+    height = max(1, round(width * CARD_SIZE[1] / CARD_SIZE[0]))
+    return ImageOps.fit(image, (width, height), Image.LANCZOS)
+
+
+def process_image(source):
+    """Уменьшает и пересохраняет картинку, готовит варианты по ширине
+    для карточек и крошечную заглушку. Возвращает ``ProcessedImage``.
+
+    ``source`` — путь к временному файлу или байты загрузки.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    with Image.open(source) as image:
+        if image.format == 'JPEG':
+            image.draft('RGB', MAX_STORED_SIZE)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(MAX_STORED_SIZE, Image.LANCZOS)
+        has_alpha = (
+            image.mode in ('RGBA', 'LA', 'PA')
+            or 'transparency' in image.info
+        )
+        if has_alpha:
+            image = image.convert('RGBA')
+        data, ext = encode(image, has_alpha)
+        widths = [
+            width for width in VARIANT_WIDTHS if width <= image.width
+        ] or VARIANT_WIDTHS[:1]
+        variants = {
+            width: encode(card_crop(image, width), has_alpha)[0]
+            for width in widths
+        }
+        tiny, tiny_ext = encode(
+            card_crop(image, PLACEHOLDER_WIDTH), has_alpha, quality=30
+        )
+        placeholder = 'data:image/{};base64,{}'.format(
+            'webp' if tiny_ext == '.webp' else 'jpeg',
+            base64.b64encode(tiny).decode(),
+        )
+        return ProcessedImage(data, ext, variants, placeholder)
+
+
+def process_upload(uploaded):
+    """Прогоняет загруженный файл через ``process_image`` и возвращает
+    новый файл для сохранения в модель."""
+    global _executor
+    if hasattr(uploaded, 'temporary_file_path'):
+        source = uploaded.temporary_file_path()
+    else:
+        uploaded.seek(0)
+        source = uploaded.read()
+    try:
+        if settings.IMAGE_PROCESS_WORKERS:
+            processed = get_executor().submit(process_image, source).result(
+                timeout=PROCESS_TIMEOUT
+            )
+        else:
+            processed = process_image(source)
+    except BrokenProcessPool:
+        _executor = None
+        raise ValidationError(
+            'Не удалось обработать картинку', code='broken'
+        )
+    except ProcessTimeout:
+        # В Python 3.11 это встроенный TimeoutError, подкласс OSError
+        raise ValidationError(
+            'Картинка обрабатывается слишком долго', code='timeout'
+        )
+    except DECODE_ERRORS:
+        raise ValidationError(
+            'Файл картинки повреждён или не читается', code='corrupt'
+        )
+    name = os.path.splitext(os.path.basename(uploaded.name))[0]
+    content_type = (
+        'image/webp' if processed.ext == '.webp' else 'image/jpeg'
+    )
+    result = SimpleUploadedFile(
+        name + processed.ext, processed.data, content_type
+    )
+    result.variants = processed.variants
+    result.placeholder = processed.placeholder
+    return result
@@ -1,12 +1,29 @@
 from django.urls import path
 
-from . import views
+from . import sitemaps, syndication, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('popular/', views.popular, name='popular'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/follow/',
+        views.group_follow,
+        name='group_follow'
+    ),
+    path(
+        'group/<slug:slug>/unfollow/',
+        views.group_unfollow,
+        name='group_unfollow'
+    ),
+    path('groups/', views.group_index, name='group_index'),
+    path(
+        'groups/trending/',
+        views.trending_groups_api,
+        name='trending_groups'
+    ),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
     # Просмотр записи
@@ -18,7 +35,37 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
     path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'groups/autocomplete/',
+        views.group_autocomplete,
+        name='group_autocomplete'
+    ),
+    # RSS и Atom
+    path('rss/', syndication.index_rss, name='index_rss'),
+    path('atom/', syndication.index_atom, name='index_atom'),
+    path('group/<slug:slug>/rss/', syndication.group_rss, name='group_rss'),
+    path(
+        'group/<slug:slug>/atom/', syndication.group_atom, name='group_atom'
+    ),
+    path(
+        'profile/<str:username>/rss/',
+        syndication.author_rss,
+        name='author_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        syndication.author_atom,
+        name='author_atom'
+    ),
+    # Карта сайта
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap'),
+    path(
+        'sitemap-posts-<int:shard>.xml',
+        sitemaps.sitemap_posts,
+        name='sitemap_posts'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -29,4 +76,14 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'profile/<str:username>/mute/',
+        views.profile_mute,
+        name='profile_mute'
+    ),
+    path(
+        'profile/<str:username>/unmute/',
+        views.profile_unmute,
+        name='profile_unmute'
+    ),
 ]
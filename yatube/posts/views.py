@@ -1,75 +1,142 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import patch_cache_control
+from django.utils.http import is_safe_url
+from django.views.decorators.http import require_GET, require_POST
 
+from .autocomplete import search_groups
+from .counters import view_counter
+from .feed import get_feed_page, get_ranked_page
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .likes import annotate_likes, like_counts, likes_version, set_like
+from .models import (
+    Follow, FollowSuggestion, Group, GroupFollow, Mute, Post, User
+)
+from .mutes import forget_muted, muted_ids
+from .popular import popular_ids
+from .recent import first_page, get_recent, is_first_page
+from .subscriptions import subscriptions_page
+from .suggestions import suggestions_for
+from .trending import trending_groups
 
-COUNT_POSTS = 10
+GROUPS_PER_PAGE = 50
 
 
 def index(request):
-    post_list = Post.objects.select_related('group', 'author').all()
-    paginator = Paginator(post_list, COUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_feed_page(
+        request, Post.objects.all(), muted_ids(request.user)
+    )
+    annotate_likes(request.user, page_obj)
     context = {
         'page_obj': page_obj,
+        'likes_version': likes_version(request.user),
+        'trending_groups': trending_groups(),
     }
     return render(request, 'posts/index.html', context)
 
 
+def popular(request):
+    page_obj = get_ranked_page(request, popular_ids())
+    annotate_likes(request.user, page_obj)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+def group_index(request):
+    paginator = Paginator(
+        Group.objects.order_by('title').only(
+            'slug', 'title', 'description', 'post_count'
+        ),
+        GROUPS_PER_PAGE
+    )
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author').all()
-    paginator = Paginator(post_list, COUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_feed_page(
+        request, group.posts.all(), muted_ids(request.user)
+    )
+    annotate_likes(request.user, page_obj)
+    following = (
+        request.user.is_authenticated
+        and GroupFollow.objects.filter(
+            group=group, user=request.user
+        ).exists()
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        'following': following,
     }
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author').all()
-    paginator = Paginator(post_list, COUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(author=author, user=request.user)
+    if is_first_page(request):
+        count, rows = get_recent([author.pk])[author.pk]
+        page_obj = first_page(rows, count, author.posts.all())
     else:
-        following = False
+        page_obj = get_feed_page(request, author.posts.all())
+    annotate_likes(request.user, page_obj)
+    following = (
+        request.user.is_authenticated
+        and request.user != author
+        and Follow.objects.filter(author=author, user=request.user).exists()
+    )
+    muted = author.pk in muted_ids(request.user)
     context = {
         'page_obj': page_obj,
         'author': author,
         'following': following,
+        'muted': muted,
+        'posts_count': page_obj.paginator.count,
+        'suggestions': suggestions_for(request.user),
     }
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post_number = get_object_or_404(Post, pk=post_id)
+    post_number = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    if request.method == 'GET':
+        view_counter.add(post_number.pk)
+    annotate_likes(request.user, [post_number])
     form = CommentForm(request.POST or None)
-    comments = post_number.comments.all()
+    muted = muted_ids(request.user)
+    comments = [
+        comment
+        for comment in post_number.comments.select_related('author')
+        if comment.author_id not in muted
+    ]
     context = {
         'post_number': post_number,
         'comments': comments,
         'form': form,
+        'views': post_number.views + view_counter.get(post_number.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
+        # От поста нужна только группа — для счётчика активности групп
+        comment.post = get_object_or_404(
+            Post.objects.only('group_id'), pk=post_id
+        )
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
@@ -90,7 +157,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id=post_id)
 
     form = PostForm(
@@ -112,31 +179,125 @@ def post_edit(request, post_id):
 @login_required
 def follow_index(request):
     user = request.user
-    post_list = Post.objects.filter(author__following__user=user)
-    paginator = Paginator(post_list, COUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = subscriptions_page(request, user, muted_ids(user))
+    annotate_likes(request.user, page_obj)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'likes_version': likes_version(user),
+        'suggestions': suggestions_for(user),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    user = request.user
-    if request.user != author and not Follow.objects.filter(
-        user=request.user,
-        author=author
-    ):
-        Follow.objects.create(user=user, author=author)
+    if username != request.user.username:
+        author_id = User.objects.filter(username=username).values_list(
+            'id', flat=True
+        ).first()
+        if author_id is None:
+            raise Http404
+        # Повторная подписка упирается в UniqueConstraint и пропускается
+        Follow.objects.bulk_create(
+            [Follow(user=request.user, author_id=author_id)],
+            ignore_conflicts=True
+        )
+        FollowSuggestion.objects.filter(
+            user=request.user, author_id=author_id
+        ).delete()
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(user=request.user, author=author).exists():
-        Follow.objects.filter(user=request.user, author=author).delete()
+    Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def group_follow(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        raise Http404
+    GroupFollow.objects.bulk_create(
+        [GroupFollow(user=request.user, group_id=group_id)],
+        ignore_conflicts=True
+    )
+    return redirect('posts:group_list', slug=slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    GroupFollow.objects.filter(
+        user=request.user, group__slug=slug
+    ).delete()
+    return redirect('posts:group_list', slug=slug)
+
+
+@login_required
+@require_POST
+def profile_mute(request, username):
+    if username != request.user.username:
+        author_id = User.objects.filter(username=username).values_list(
+            'id', flat=True
+        ).first()
+        if author_id is None:
+            raise Http404
+        Mute.objects.bulk_create(
+            [Mute(user=request.user, author_id=author_id)],
+            ignore_conflicts=True
+        )
+        forget_muted(request.user.pk)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@require_POST
+def profile_unmute(request, username):
+    Mute.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    forget_muted(request.user.pk)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@require_POST
+def post_like(request, post_id):
+    """Ставит (like=1) или снимает (like=0) отметку; повтор запроса
+    ничего не меняет."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    liked = request.POST.get('like') == '1'
+    set_like(request.user, post_id, liked)
+    if request.is_ajax():
+        return JsonResponse({
+            'liked': liked, 'likes': like_counts([post_id])[post_id]
+        })
+    next_url = request.POST.get('next')
+    if next_url and is_safe_url(
+        next_url, {request.get_host()}, request.is_secure()
+    ):
+        return redirect(next_url)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@require_GET
+def trending_groups_api(request):
+    response = JsonResponse({'results': trending_groups()})
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+
+@require_GET
+def group_autocomplete(request):
+    query = request.GET.get('q', '').strip()
+    response = JsonResponse(
+        {'results': search_groups(query) if query else []}
+    )
+    patch_cache_control(response, public=True, max_age=60)
+    return response
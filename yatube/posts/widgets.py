@@ -0,0 +1,27 @@
+from django import forms
+from django.urls import reverse
+
+from .models import Group
+
+
+class GroupAutocompleteWidget(forms.Widget):
+    """Поле выбора группы с подсказками вместо ``<select>``.
+
+    Рисует только выбранную группу, а варианты подгружает по мере ввода
+    из ``posts:group_autocomplete``, поэтому список всех групп не
+    читается из базы при показе формы.
+    """
+    template_name = 'posts/widgets/group_autocomplete.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        title = ''
+        if value is not None and str(value).isdigit():
+            title = Group.objects.filter(pk=value).values_list(
+                'title', flat=True
+            ).first() or ''
+        context['widget'].update({
+            'title': title,
+            'url': reverse('posts:group_autocomplete'),
+        })
+        return context
@@ -0,0 +1,15 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from core.deletion import delete_in_background
+
+User = get_user_model()
+
+
+class BackgroundDeletionUserAdmin(UserAdmin):
+    actions = (delete_in_background,)
+
+
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeletionUserAdmin)
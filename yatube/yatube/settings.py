@@ -46,11 +46,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.forms',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.static.PrecompressedStaticMiddleware',
+    'core.middleware.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,6 +82,9 @@ TEMPLATES = [
     },
 ]
 
+# Шаблоны виджетов форм ищутся там же, где остальные шаблоны проекта
+FORM_RENDERER = 'django.forms.renderers.TemplatesSetting'
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -131,6 +137,8 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = 'core.staticfiles.PrecompressedManifestStorage'
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -141,11 +149,38 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Фоновые удаления из админки сразу запускаются в отдельном потоке;
+# без него их выполняет manage.py process_deletions
+DELETION_IN_BACKGROUND_THREAD = True
+# Сколько процессов обрабатывают загруженные картинки (0 — в потоке запроса)
+IMAGE_PROCESS_WORKERS = 2
+# Кто отдаёт байты медиафайлов: None — сам Django (FileResponse),
+# 'x-accel-redirect' — nginx, 'x-sendfile' — Apache или lighttpd
+MEDIA_SERVE_BACKEND = None
+# internal location nginx, который смотрит в MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Сигналы правят записи кэша на месте (последние посты, скрытые авторы,
+# суммы отметок, поколение страниц), поэтому кэш должен быть общим для
+# всех процессов: LocMemCache у каждого процесса свой, и остальные
+# процессы отдавали бы устаревшие записи. В работе это memcached, адреса
+# серверов через запятую — в MEMCACHED_LOCATION. Без него (при
+# разработке) кэш свой у процесса, о чём напоминает проверка core.W001.
+if os.environ.get('MEMCACHED_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ['MEMCACHED_LOCATION'].split(','),
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+# Тесты чистят кэш и не должны трогать общий кэш сайта
+TEST_RUNNER = 'core.runner.LocalCacheTestRunner'
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Просмотры постов копятся в памяти и пишутся в базу фоновым потоком
+from posts.counters import view_counter  # noqa: E402
+
+view_counter.start_flusher()